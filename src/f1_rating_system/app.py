@@ -7,9 +7,11 @@ goat_page = st.Page("pages/goat.py", title="Who is the F1 GOAT?", url_path="who-
 cur_dri_page = st.Page("pages/current_drivers.py", title="Current driver ratings", url_path="current-driver-ratings", icon=":material/sports_motorsports:")
 cur_con_page = st.Page("pages/current_constructors.py", title="Current constructor ratings", url_path="current-constructor-ratings", icon=":material/auto_transmission:")
 com_dri_page = st.Page("pages/compare_drivers.py", title="Compare driver ratings", url_path="compare-driver-ratings", icon=":material/group:")
+h2h_page = st.Page("pages/head_to_head.py", title="Head to head", url_path="head-to-head", icon=":material/sports_score:")
+champ_page = st.Page("pages/championship.py", title="Championship odds", url_path="championship-odds", icon=":material/trophy:")
 com_con_page = st.Page("pages/compare_constructors.py", title="Compare constructor ratings", url_path="compare-constructor-ratings", icon=":material/swap_driving_apps:")
 
-page_nav = st.navigation([home_page, goat_page, cur_dri_page, cur_con_page, com_dri_page, com_con_page])
+page_nav = st.navigation([home_page, goat_page, cur_dri_page, cur_con_page, com_dri_page, com_con_page, h2h_page, champ_page])
 page_nav.run()
 
 st.sidebar.markdown("""
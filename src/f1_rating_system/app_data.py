@@ -0,0 +1,176 @@
+import collections
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from f1_rating_system import downsample, rating_store, storage
+from f1_rating_system.config import get_config
+
+
+CONFIG = get_config()
+
+# processed tables loaded whole, by data config key
+TABLE_KEYS = ["avg_goat_path", "cur_dri_path", "dri_imp_path", "cur_con_path", "con_imp_path"]
+
+# processed tables of optional stages, loaded by the pages using them
+OPTIONAL_TABLE_KEYS = ["season_sim_path"]
+
+# rating histories kept per process, least recently used dropped first
+HISTORY_CACHE_SIZE = 256
+
+
+class AppData():
+    '''Processed data shared read-only by all app pages and sessions. Rating
+    histories are queried per driver and constructor from the rating store
+    on first selection, so loading costs do not grow with the whole history.
+    Lazily loaded data is shared by all sessions' threads and guarded by a lock.'''
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.db_path = config["data"]["rating_db_path"]
+        self.histories = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.tables = {key: pd.read_csv(config["data"][key]) for key in TABLE_KEYS}
+        self.driver_names = rating_store.get_names(self.db_path, "drivers")
+        self.constructor_names = rating_store.get_names(self.db_path, "constructors")
+
+        with open(config["data"]["last_race_path"], "r") as infile:
+            self.last_race = json.load(infile)["last_race"]
+
+        with open(config["data"]["chart_spec_path"], "r") as infile:
+            self.chart_specs = json.load(infile)
+
+        # win probability matrices with row and column indices per driver id
+        with np.load(config["data"]["h2h_path"]) as h2h:
+            self.h2h = dict(h2h)
+        self.grid_index = {driver_id: ix for ix, driver_id in enumerate(self.h2h["grid_ids"].tolist())}
+        self.peak_index = {driver_id: ix for ix, driver_id in enumerate(self.h2h["driver_ids"].tolist())}
+        self.h2h_names = dict(zip(self.h2h["driver_ids"].tolist(), self.h2h["driver_names"].tolist()))
+
+        # teammate record rows per pair of driver ids
+        self.teammates = storage.read_dataset("teammates_path", config=config)
+        self.teammate_rows = self.teammates.groupby(["driverIdA", "driverIdB"]).indices
+
+    def get_optional_table(self, key: str) -> pd.DataFrame | None:
+        '''Returns a processed table of an optional stage by data config key,
+        loading it on first use, or None if the stage has not written it'''
+
+        with self.lock:
+            if key not in self.tables:
+                path = self.config["data"][key]
+                self.tables[key] = pd.read_csv(path) if os.path.exists(path) else None
+
+            return self.tables[key]
+
+    def get_chart_spec(self, name: str, theme: dict = None) -> dict:
+        '''Returns the precompiled Vega-Lite spec of a static chart for the
+        base of the given streamlit theme, defaulting to light'''
+
+        theme_base = (theme or {}).get("base")
+        return self.chart_specs[theme_base if theme_base in self.chart_specs else "light"][name]
+
+    def get_name_history(self, kind: str, name: str, n_points: int = None) -> pd.DataFrame:
+        '''Returns the rating history of a named driver or constructor, each
+        of its ids downsampled to n_points dates if given, querying and
+        downsampling it on first use. Keeps the HISTORY_CACHE_SIZE most
+        recently used histories.'''
+
+        key = (kind, name, n_points)
+        with self.lock:
+            hist_df = self.histories.get(key)
+            if hist_df is not None:
+                self.histories.move_to_end(key)
+                return hist_df
+
+        # query outside the lock so other sessions' lookups are not blocked
+
+        if n_points is None:
+            hist_df = rating_store.get_history(self.db_path, kind, [name])
+        else:
+            id_col, score_col = rating_store.KINDS[kind]["id_col"], rating_store.KINDS[kind]["score_col"]
+            hist_df = downsample.downsample_groups(self.get_name_history(kind, name), id_col, "date", score_col, n_points)
+
+        with self.lock:
+            self.histories[key] = hist_df
+            self.histories.move_to_end(key)
+            if len(self.histories) > HISTORY_CACHE_SIZE:
+                self.histories.popitem(last=False)
+
+        return hist_df
+
+    def get_history(self, kind: str, names: list, n_points: int = None) -> pd.DataFrame:
+        '''Returns the plotted rating history columns of the named drivers or
+        constructors, each downsampled to n_points dates if given'''
+
+        hist_dfs = [self.get_name_history(kind, name, n_points) for name in names]
+        hist_cols = rating_store.HISTORY_COLUMNS[kind]
+        return pd.concat(hist_dfs, ignore_index=True)[hist_cols] if hist_dfs else pd.DataFrame(columns=hist_cols)
+
+    def get_win_prob(self, driver_a: int, driver_b: int, matrix: str = "grid_win_prob") -> float:
+        '''Returns the precomputed probability that driver A beats driver B,
+        by driver id, from a head-to-head matrix: "grid_win_prob" or
+        "same_car_win_prob" of the current grid, or "peak_win_prob" of all
+        drivers'''
+
+        index = self.peak_index if matrix == "peak_win_prob" else self.grid_index
+        return float(self.h2h[matrix][index[driver_a], index[driver_b]])
+
+    def get_teammate_record(self, driver_a: int, driver_b: int) -> pd.DataFrame:
+        '''Returns driver A's head-to-head record and rating gaps against
+        driver B per season they were teammates, by driver id, empty if they
+        never were'''
+        return self.teammates.iloc[self.teammate_rows.get((driver_a, driver_b), [])]
+
+    def get_driver_history(self, names: list, n_points: int = None) -> pd.DataFrame:
+        '''Returns the rating histories of the named drivers'''
+        return self.get_history("drivers", names, n_points)
+
+    def get_constructor_history(self, names: list, n_points: int = None) -> pd.DataFrame:
+        '''Returns the rating histories of the named constructors'''
+        return self.get_history("constructors", names, n_points)
+
+
+def show_missing_bounds(df: pd.DataFrame, lower_col: str) -> None:
+    '''Notes on a page that some of the ratings it plots have no interval
+    bands, if lower_col has missing bootstrap bounds'''
+
+    if df[lower_col].isna().any():
+        st.caption("Some ratings have no interval bands, as they were modelled after the last bootstrap. Run `make data_bootstrap` to refresh them.")
+
+
+def get_series_points(config: dict, n_series: int, full_resolution: bool = False) -> int | None:
+    '''Returns the points per series that keep a chart of n_series series
+    within the configured chart points, or None for full resolution'''
+
+    if full_resolution:
+        return None
+
+    return max(config["app"]["chart_points"] // max(n_series, 1), 3)
+
+
+def get_mtimes(config: dict) -> tuple:
+    '''Returns the modification times of the processed files the app reads,
+    with None for optional tables not yet written'''
+
+    paths = [config["data"][key] for key in ["rating_db_path", "last_race_path", "chart_spec_path", "h2h_path", "teammates_path"] + TABLE_KEYS]
+    optional_paths = [config["data"][key] for key in OPTIONAL_TABLE_KEYS]
+    return tuple(os.stat(path).st_mtime_ns for path in paths) + tuple(
+        os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in optional_paths
+    )
+
+
+@st.cache_resource(max_entries=1)
+def load_app_data(mtimes: tuple) -> AppData:
+    '''Loads the app data once per process for the given file modification
+    times, so new processed files replace it'''
+    return AppData(CONFIG)
+
+
+def get_app_data() -> AppData:
+    '''Returns the process-wide app data, reloading it if processed files
+    have changed since it was loaded'''
+    return load_app_data(get_mtimes(CONFIG))
@@ -0,0 +1,99 @@
+import concurrent.futures
+import json
+import os
+
+import pandas as pd
+
+from f1_rating_system import model, storage
+from f1_rating_system.config import get_config
+from f1_rating_system.diagnostics import PredictionDiagnostics
+
+
+# global variables
+CONFIG = get_config()
+FEATURES_DF = None
+
+
+def load_features(config: dict) -> None:
+    '''Worker initialiser reading the features once per process'''
+
+    global FEATURES_DF
+    FEATURES_DF = storage.read_dataset("features_path", config=config)
+
+
+def run_fold(test_year: int, config: dict) -> dict:
+    '''Fits params on the seasons before test_year and returns prediction
+    diagnostics of the fitted model on test_year. The test season is
+    replayed alone, from the rating state the fitted replay of the training
+    seasons ends with.'''
+
+    train_df = FEATURES_DF[FEATURES_DF["year"] < test_year].reset_index(drop=True)
+    test_df = FEATURES_DF[FEATURES_DF["year"] == test_year].reset_index(drop=True)
+    start_score = config["model"]["start_score"]
+    backend = model.get_backend(config)
+
+    rating_model = model.RatingModel(config, mod_data=model.ModelData(train_df))
+    params = rating_model.fit_params()
+
+    # replay training seasons at the fitted params to checkpoint their final state
+    train_loss = model.replay(rating_model.data, params[None, :], start_score, backend=backend)[0]
+    test_data = model.ModelData(test_df, init_state=rating_model.data.get_state())
+
+    diagnostics = PredictionDiagnostics()
+    model.replay(test_data, params[None, :], start_score, diagnostics=diagnostics, backend=backend)
+    metrics = diagnostics.get_metrics()
+
+    return {
+        "test_year": int(test_year),
+        "train_seasons": int(train_df["year"].nunique()),
+        "params": dict(zip(backend.param_names, params.tolist())),
+        "optimizer": rating_model.fit_stats,
+        "train_log_loss": float(train_loss),
+        "pairs": metrics["pairs"],
+        "log_loss": metrics["log_loss"],
+        "brier_score": metrics["brier_score"],
+        "accuracy": metrics["accuracy"]
+    }
+
+
+def run_backtest(config: dict = None) -> dict:
+    '''Walks forward over the seasons from the configured first test year,
+    or the second season if later, fitting each fold on all earlier seasons
+    and scoring it on the next, with folds run concurrently. Writes per-fold
+    and pair-weighted overall log loss and Brier score to the backtest path.'''
+
+    config = config or CONFIG
+    backtest_config = config["backtest"]
+    years = storage.read_dataset("features_path", columns=["year"], config=config)["year"].unique()
+    # every fold needs at least one earlier season to fit on
+    test_years = sorted(years[(years >= backtest_config["first_test_year"]) & (years > years.min())].tolist())
+    if not test_years:
+        raise ValueError(
+            f"no seasons to test from backtest.first_test_year {backtest_config['first_test_year']} "
+            f"after the first season {years.min()}, the last season is {years.max()}"
+        )
+
+    n_jobs = backtest_config["n_jobs"] or os.cpu_count()
+
+    with concurrent.futures.ProcessPoolExecutor(min(n_jobs, len(test_years)), initializer=load_features, initargs=(config,)) as pool:
+        folds = list(pool.map(run_fold, test_years, [config] * len(test_years)))
+
+    fold_df = pd.DataFrame(folds)
+    pair_weights = fold_df["pairs"] / fold_df["pairs"].sum()
+    results = {
+        "folds": folds,
+        "pairs": int(fold_df["pairs"].sum()),
+        "log_loss": float((fold_df["log_loss"] * pair_weights).sum()),
+        "brier_score": float((fold_df["brier_score"] * pair_weights).sum()),
+        "accuracy": float((fold_df["accuracy"] * pair_weights).sum())
+    }
+
+    with open(config["data"]["backtest_path"], "w") as out:
+        json.dump(results, out, indent=2)
+
+    print(fold_df[["test_year", "pairs", "log_loss", "brier_score", "accuracy"]].to_string(index=False))
+    return results
+
+
+if __name__=="__main__":
+    run_backtest()
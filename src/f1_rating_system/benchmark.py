@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from f1_rating_system import data, features, model, report, storage
+from f1_rating_system.config import CONFIG_PATH, get_config, load_config
+
+
+CONFIG = get_config()
+
+# raw status labels by the category create_features maps them to
+STATUSES = [
+    "Finished", "+1 Lap", "+2 Laps",                   # finished
+    "Collision", "Accident", "Spun off",                # driver retirement
+    "Engine", "Gearbox", "Hydraulics", "Electrical",   # constructor retirement
+    "Withdrew", "Injured", "Not classified"            # misc retirement
+]
+RETIREMENT_STATUSES = {"driver": [4, 5, 6], "constructor": [7, 8, 9, 10], "misc": [11, 12, 13]}
+RETIREMENT_PROBS = {"driver": 0.4, "constructor": 0.5, "misc": 0.1}
+
+# fixed params of golden model outputs
+GOLDEN_PARAMS = np.array([400, 0.5, 32, 32], dtype=float)
+
+# modelled columns compared between equivalent model paths
+OUTPUT_COLUMNS = ["driverScore", "constructorScore", "expected", "actual"]
+
+
+def generate_seasons(raw_dir: str, n_seasons: int, n_rounds: int, grid_size: int, retirement_rate: float, seed: int = 0) -> None:
+    '''Writes Ergast-shaped raw tables for synthetic seasons to raw_dir. Each
+    season pairs drivers into constructors, and race results follow latent
+    driver and constructor strengths, with qualifying ties from pit lane
+    starts, mid-season substitutes and retirements at retirement_rate.'''
+
+    rng = np.random.default_rng(seed)
+    n_cons = grid_size // 2
+    n_drivers = grid_size * 3 # pool of drivers across seasons
+    dri_skill = rng.normal(0, 1, n_drivers)
+    races, results, con_years = [], [], []
+
+    for season in range(n_seasons):
+        year = 2000 + season
+        con_skill = rng.normal(0, 1.5, n_cons)
+        lineup = rng.choice(n_drivers, size=2 * n_cons, replace=False)
+        con_years += [(con_id + 1, f"Constructor {con_id + 1}", year, n_seasons, con_id + 1) for con_id in range(n_cons)]
+
+        for round_ix in range(1, n_rounds + 1):
+            race_id = len(races) + 1
+            race_date = pd.Timestamp(year, 3, 1) + pd.Timedelta(weeks=round_ix)
+            races.append((race_id, year, round_ix, round_ix, f"Grand Prix {round_ix}", race_date.strftime("%Y-%m-%d")))
+
+            # substitute a driver not in the lineup
+            drivers = lineup.copy()
+            if rng.random() < 0.1:
+                drivers[rng.integers(drivers.shape[0])] = rng.choice(np.setdiff1d(np.arange(n_drivers), lineup))
+
+            con_ids = np.arange(drivers.shape[0]) // 2
+            pace = dri_skill[drivers] + con_skill[con_ids]
+            grid = np.argsort(np.argsort(-(pace + rng.gumbel(size=pace.shape)))) + 1
+            grid[rng.random(grid.shape) < 0.02] = 0 # pit lane starts
+            finish_order = np.argsort(-(pace + rng.gumbel(size=pace.shape)))
+
+            retired = rng.random(drivers.shape) < retirement_rate
+            kinds = rng.choice(list(RETIREMENT_PROBS), size=drivers.shape, p=list(RETIREMENT_PROBS.values()))
+            position = 0
+            for entry in finish_order:
+                if retired[entry]:
+                    status_id, pos = rng.choice(RETIREMENT_STATUSES[kinds[entry]]), "\\N"
+                else:
+                    position += 1
+                    status_id, pos = rng.choice([1, 2, 3], p=[0.7, 0.2, 0.1]), position
+
+                results.append((len(results) + 1, race_id, drivers[entry] + 1, con_ids[entry] + 1, grid[entry], pos, status_id))
+
+    os.makedirs(raw_dir, exist_ok=True)
+    pd.DataFrame(races, columns=["raceId", "year", "round", "circuitId", "name", "date"]).to_csv(os.path.join(raw_dir, "races.csv"), index=False)
+    pd.DataFrame(results, columns=["resultId", "raceId", "driverId", "constructorId", "grid", "position", "statusId"]).to_csv(os.path.join(raw_dir, "results.csv"), index=False)
+    pd.DataFrame({"statusId": range(1, len(STATUSES) + 1), "status": STATUSES}).to_csv(os.path.join(raw_dir, "status.csv"), index=False)
+
+    # drop a constructor-year to exercise id imputation
+    con_yr_df = pd.DataFrame(con_years, columns=["constructorId", "constructorName", "year", "n_years", "constructorYearId"])
+    con_yr_df.iloc[:-1].to_csv(os.path.join(raw_dir, "constructor_year.csv"), index=False)
+
+    pd.DataFrame({
+        "driverId": range(1, n_drivers + 1),
+        "forename": ["Driver"] * n_drivers,
+        "surname": [f"D{dri_id}" for dri_id in range(1, n_drivers + 1)]
+    }).to_csv(os.path.join(raw_dir, "drivers.csv"), index=False)
+    pd.DataFrame({"constructorId": range(1, n_cons + 1), "name": [f"Constructor {con_id}" for con_id in range(1, n_cons + 1)]}).to_csv(os.path.join(raw_dir, "constructors.csv"), index=False)
+    pd.DataFrame({"constructorId": range(1, n_cons + 1), "hex_code": "#808080"}).to_csv(os.path.join(raw_dir, "constructor_colours.csv"), index=False)
+
+
+def make_config(work_dir: str) -> dict:
+    '''Returns the project config with its data paths inside work_dir, the
+    model cache disabled and the elo backend the golden outputs are from,
+    creating the data directories'''
+
+    shutil.copy(CONFIG_PATH, os.path.join(work_dir, "params.yaml"))
+    config = load_config(os.path.join(work_dir, "params.yaml"))
+    config["model"]["cache"]["enabled"] = False
+    config["model"]["backend"] = "elo"
+
+    for path in config["data"].values():
+        if isinstance(path, str):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    return config
+
+
+def time_call(func, repeats: int = 1) -> tuple:
+    '''Returns the fastest wall time in seconds of repeated calls of func and
+    its last result'''
+
+    wall_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = func()
+        wall_times.append(time.perf_counter() - start_time)
+
+    return min(wall_times), result
+
+
+def compare_backends(config: dict, n_cand: int, repeats: int) -> dict:
+    '''Returns the fitted loss and params, fit wall time and candidate
+    evaluations, and batched evaluations per second of n_cand candidates of
+    each rating backend on the same features'''
+
+    comparison = {}
+    for name, backend in model.BACKENDS.items():
+        rating_model = model.RatingModel(config | {"model": config["model"] | {"backend": name}})
+        fit_secs, params = time_call(rating_model.fit_params)
+        fit_evals = rating_model.data.n_evals
+
+        param_mat = np.tile(np.asarray(backend.default_params, dtype=float), (n_cand, 1))
+        eval_secs, _ = time_call(lambda: rating_model.model_data_batch(param_mat), repeats)
+
+        comparison[name] = {
+            "loss": float(rating_model.model_data(params)),
+            "params": dict(zip(backend.param_names, params.tolist())),
+            "fit_secs": fit_secs,
+            "fit_evaluations": fit_evals,
+            "evaluations_per_sec": n_cand / eval_secs
+        }
+
+    return comparison
+
+
+class UnitPoisson():
+    '''Stands in for the random generator of bootstrap replays, drawing every
+    pair exactly once so a resampled replay equals a plain one'''
+
+    def poisson(self, lam: float, size: tuple) -> np.ndarray:
+        return np.ones(size, dtype=np.int64)
+
+
+def is_close(expected: np.ndarray, actual: np.ndarray, rtol: float = 1e-9, atol: float = 1e-9) -> bool:
+    '''Returns whether arrays have the same shape and close values, with NaNs
+    in the same places'''
+
+    expected, actual = np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)
+    return expected.shape == actual.shape and np.allclose(expected, actual, rtol=rtol, atol=atol, equal_nan=True)
+
+
+def check_equivalences(config: dict) -> list:
+    '''Returns names of model paths whose results differ from an equivalent
+    path on the features of config: streamed and in-memory replays and
+    batched and single candidates of each backend, bootstrap replays drawing
+    every pair once and plain replays, analytic and finite-difference
+    gradients, and incremental and full updates with the fitted params'''
+
+    start_score = config["model"]["start_score"]
+    failures = []
+
+    for name, backend in model.BACKENDS.items():
+        rating_model = model.RatingModel(config | {"model": config["model"] | {"backend": name}})
+        param_mat = np.asarray(backend.default_params, dtype=float) * np.array([[1.0], [0.9], [1.1]])
+
+        loss = rating_model.model_data(param_mat[0], export=True)
+        replay_df = storage.read_dataset("modelled_path", columns=OUTPUT_COLUMNS, config=config)
+        stream_loss = rating_model.stream_data(param_mat[0])
+        stream_df = storage.read_dataset("modelled_path", columns=OUTPUT_COLUMNS, config=config)
+        if not (is_close(loss, stream_loss) and is_close(replay_df.to_numpy(), stream_df.to_numpy())):
+            failures.append(f"{name}_stream")
+
+        losses = rating_model.model_data_batch(param_mat)
+        single_losses = [rating_model.model_data_batch(params[None, :])[0] for params in param_mat]
+        if not is_close(losses, single_losses):
+            failures.append(f"{name}_batch")
+
+        plain_losses = model.replay(rating_model.data, param_mat, start_score, export=True, backend=backend)
+        plain_scores = rating_model.data.dri_scores.copy()
+        boot_losses = model.replay(rating_model.data, param_mat, start_score, export=True, bootstrap_rng=UnitPoisson(), backend=backend)
+        if not (is_close(plain_losses, boot_losses) and is_close(plain_scores, rating_model.data.dri_scores)):
+            failures.append(f"{name}_bootstrap")
+
+        if backend.has_jac:
+            grad = rating_model.model_data_batch(param_mat, jac=True)[1]
+            diff_grad = model.replay_finite_diffs(rating_model.data, param_mat, start_score, backend=backend)[1]
+            if not is_close(grad, diff_grad, rtol=1e-3, atol=1e-6):
+                failures.append(f"{name}_gradient")
+
+    # rate all but the last rounds, then add them from the checkpoint
+    features_df = storage.read_dataset("features_path", config=config)
+    round_keys = features_df["year"] * 1000 + features_df["round"]
+    try:
+        storage.write_dataset(features_df[round_keys < np.sort(round_keys.unique())[-3]], "features_path", config=config)
+        model.RatingModel(config).update_data()
+    finally:
+        storage.write_dataset(features_df, "features_path", config=config)
+
+    rating_model = model.RatingModel(config)
+    rating_model.update_data()
+    update_df = storage.read_dataset("modelled_path", columns=OUTPUT_COLUMNS, config=config)
+    rating_model.model_data(rating_model.load_params(), export=True)
+    replay_df = storage.read_dataset("modelled_path", columns=OUTPUT_COLUMNS, config=config)
+    if not is_close(replay_df.to_numpy(), update_df.to_numpy()):
+        failures.append("incremental_update")
+
+    return failures
+
+
+def benchmark_size(size: dict, retirement_rate: float, repeats: int, seed: int, n_cand: int, check: bool = False) -> tuple:
+    '''Returns wall times of each pipeline stage on synthetic seasons of the
+    given size, the number of result rows, golden outputs of the model, a
+    comparison of the rating backends and, if check = True, names of model
+    paths differing from equivalent ones (see check_equivalences)'''
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = make_config(work_dir)
+        generate_seasons(os.path.dirname(config["data"]["results_csv"]), retirement_rate=retirement_rate, seed=seed, **size)
+
+        wall_times = {}
+        wall_times["preprocess_data"], _ = time_call(lambda: data.preprocess_data(config), repeats)
+        wall_times["create_features"], _ = time_call(lambda: features.create_features(config), repeats)
+
+        rating_model = model.RatingModel(config)
+        wall_times["load_model_data"], mod_data = time_call(lambda: rating_model.data)
+        wall_times["model_data"], _ = time_call(lambda: rating_model.model_data(GOLDEN_PARAMS), repeats)
+        wall_times["fit_params"], params = time_call(rating_model.fit_params)
+        rating_model.log_results(params)
+        wall_times["make_report_data"], _ = time_call(lambda: report.make_report_data(config), repeats)
+
+        # model outputs at fixed params, guarding rewrites of the pipeline
+        loss = rating_model.model_data(GOLDEN_PARAMS, export=True)
+        mod_df = storage.read_dataset("modelled_path", config=config)
+        outputs = {
+            "loss": np.asarray(loss),
+            "mapPosition": mod_df["mapPosition"].to_numpy(),
+            "status": mod_df["status"].to_numpy(dtype=str),
+            "driverScore": mod_df["driverScore"].to_numpy(),
+            "constructorScore": mod_df["constructorScore"].to_numpy(),
+            "expected": mod_df["expected"].to_numpy(),
+            "actual": mod_df["actual"].to_numpy()
+        }
+
+        mismatches = check_equivalences(config) if check else []
+        return wall_times, mod_data.features_df.shape[0], outputs, compare_backends(config, n_cand, repeats), mismatches
+
+
+def check_golden(outputs: dict, golden_path: str) -> list:
+    '''Returns names of outputs differing from the golden outputs'''
+
+    with np.load(golden_path) as golden:
+        return [
+            name for name, values in outputs.items()
+            if name not in golden or golden[name].shape != values.shape or not (
+                np.allclose(golden[name], values, rtol=1e-9, atol=1e-9) if values.dtype.kind == "f"
+                else np.array_equal(golden[name], values)
+            )
+        ]
+
+
+def run_benchmark(update_golden: bool = False) -> dict:
+    '''Times pipeline stages and compares rating backends at each benchmark
+    size, checks model outputs at the golden size against the golden
+    outputs (or replaces them if update_golden = True) and against
+    equivalent model paths, and writes results to the benchmark path'''
+
+    bench_config = CONFIG["benchmark"]
+    golden_path = CONFIG["data"]["benchmark_golden_path"]
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "sizes": {}
+    }
+
+    for name, size in bench_config["sizes"].items():
+        is_golden = name == bench_config["golden_size"]
+        wall_times, n_rows, outputs, backends, mismatches = benchmark_size(
+            size, bench_config["retirement_rate"], bench_config["repeats"], bench_config["seed"], bench_config["backend_candidates"],
+            check=is_golden
+        )
+        results["sizes"][name] = size | {"rows": n_rows, "wall_times": wall_times, "backends": backends}
+        print(f"{name} ({n_rows} rows): " + ", ".join(f"{stage} {secs:.3f}s" for stage, secs in wall_times.items()))
+        print(f"{name} backends: " + ", ".join(
+            f"{backend} loss {stats['loss']:.4f} {stats['evaluations_per_sec']:.1f} evals/s" for backend, stats in backends.items()
+        ))
+
+        if is_golden:
+            results["equivalence_mismatches"] = mismatches
+            if update_golden:
+                np.savez(golden_path, **outputs)
+                results["golden_mismatches"] = []
+            else:
+                results["golden_mismatches"] = check_golden(outputs, golden_path)
+
+    with open(CONFIG["data"]["benchmark_path"], "w") as out:
+        json.dump(results, out, indent=2)
+
+    return results
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rating pipeline on synthetic seasons")
+    parser.add_argument("--update-golden", action="store_true", help="replace golden model outputs with the current ones")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.update_golden)
+    if results["golden_mismatches"]:
+        raise SystemExit(f"outputs differ from golden outputs: {', '.join(results['golden_mismatches'])}")
+    if results["equivalence_mismatches"]:
+        raise SystemExit(f"outputs differ from equivalent model paths: {', '.join(results['equivalence_mismatches'])}")
@@ -0,0 +1,90 @@
+import concurrent.futures
+import os
+
+import numpy as np
+import pandas as pd
+
+from f1_rating_system import model, storage
+from f1_rating_system.config import get_config
+
+
+# global variables
+CONFIG = get_config()
+MOD_DATA = None
+
+# modelled columns identifying rows and checking bounds match the modelled data
+KEY_COLUMNS = ["year", "round", "driverId", "constructorYearId", "driverScore"]
+
+
+def load_model_data(config: dict) -> None:
+    '''Worker initialiser building the model data once per process from the
+    modelled data's features'''
+
+    global MOD_DATA
+    MOD_DATA = model.ModelData(storage.read_dataset("modelled_path", columns=list(storage.FEATURES_SCHEMA), config=config))
+
+
+def run_replicates(params: np.ndarray, n_reps: int, seed: np.random.SeedSequence, start_score: float, backend: type) -> tuple:
+    '''Returns the driver and constructor scores of every row in n_reps
+    bootstrap replicates, replayed together as candidates of one batch'''
+
+    param_mat = np.tile(np.asarray(params, dtype=float), (n_reps, 1))
+    model.replay(MOD_DATA, param_mat, start_score, export=True, bootstrap_rng=np.random.default_rng(seed), backend=backend)
+    return MOD_DATA.dri_scores.astype(np.float32), MOD_DATA.con_scores.astype(np.float32)
+
+
+def get_career_bounds(driver_ids: np.ndarray, dri_scores: np.ndarray, quantiles: list) -> pd.DataFrame:
+    '''Returns quantiles of each driver's mean rating over all races started
+    across the (replicates, rows) driver scores'''
+
+    dri_ids, dri_inv = np.unique(driver_ids, return_inverse=True)
+    n_races = np.bincount(dri_inv)
+    career_means = np.stack([np.bincount(dri_inv, weights=rep_scores) / n_races for rep_scores in dri_scores])
+    lower, upper = np.quantile(career_means, quantiles, axis=0)
+    return pd.DataFrame({"driverId": dri_ids, "meanScoreLower": lower, "meanScoreUpper": upper})
+
+
+def bootstrap_ratings(config: dict = None) -> None:
+    '''Replays bootstrap resamples of the history at the fitted params and
+    saves interval bounds of every modelled row's driver and constructor
+    ratings and of each driver's career mean rating. Replicates run in
+    batches, seeded from the configured seed so results do not depend on
+    the number of worker processes.'''
+
+    config = config or CONFIG
+    boot_config = config["bootstrap"]
+    params = model.RatingModel(config).load_params()
+    mod_df = storage.read_dataset("modelled_path", columns=KEY_COLUMNS, config=config)
+
+    n_reps, batch_reps = boot_config["n_replicates"], boot_config["batch_replicates"]
+    batch_sizes = [min(batch_reps, n_reps - start) for start in range(0, n_reps, batch_reps)]
+    seeds = np.random.SeedSequence(boot_config["seed"]).spawn(len(batch_sizes))
+    n_jobs = min(boot_config["n_jobs"] or os.cpu_count(), len(batch_sizes))
+    batch_args = [
+        [params] * len(batch_sizes), batch_sizes, seeds,
+        [config["model"]["start_score"]] * len(batch_sizes), [model.get_backend(config)] * len(batch_sizes)
+    ]
+
+    if n_jobs == 1:
+        load_model_data(config)
+        results = list(map(run_replicates, *batch_args))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(n_jobs, initializer=load_model_data, initargs=(config,)) as pool:
+            results = list(pool.map(run_replicates, *batch_args))
+
+    dri_scores = np.concatenate([dri_batch for dri_batch, _ in results])
+    con_scores = np.concatenate([con_batch for _, con_batch in results])
+    quantiles = [(1 - boot_config["interval"]) / 2, (1 + boot_config["interval"]) / 2]
+
+    dri_lower, dri_upper = np.quantile(dri_scores, quantiles, axis=0)
+    con_lower, con_upper = np.quantile(con_scores, quantiles, axis=0)
+    bounds_df = mod_df.assign(
+        driverScoreLower=dri_lower, driverScoreUpper=dri_upper,
+        constructorScoreLower=con_lower, constructorScoreUpper=con_upper
+    )
+    storage.write_dataset(bounds_df, "bootstrap_path", config=config)
+    storage.write_dataset(get_career_bounds(mod_df["driverId"].to_numpy(), dri_scores, quantiles), "career_bounds_path", config=config)
+
+
+if __name__=="__main__":
+    bootstrap_ratings()
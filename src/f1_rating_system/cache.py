@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+# fraction of the size limit a process writes to a cache between evictions
+EVICT_FRACTION = 0.1
+
+# bytes written per cache directory since this process last evicted from it
+WRITTEN_BYTES = {}
+
+
+class ResultCache():
+    '''Size-bounded, least recently used on-disk cache of named numpy arrays'''
+
+    def __init__(self, cache_dir: str, max_size_mb: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_size_mb * 1024 ** 2
+
+    @staticmethod
+    def get_key(*parts) -> str:
+        '''Returns a hash key for json-serialisable parts'''
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        '''Returns the path of a cache entry'''
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key: str) -> dict | None:
+        '''Returns the arrays cached under key, or None if not cached'''
+
+        path = self.get_path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = dict(entry)
+        except (OSError, ValueError): # missing or partially written entry
+            return None
+
+        try:
+            os.utime(path) # mark as recently used
+        except FileNotFoundError: # evicted by another process since loading
+            pass
+
+        return arrays
+
+    def put(self, key: str, **arrays) -> None:
+        '''Caches arrays under key and evicts least recently used entries
+        above the size limit. The cache is scanned on a process's first write
+        and after each further EVICT_FRACTION of the size limit it writes,
+        so it may overshoot by that much per process between scans.'''
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.get_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as out:
+            np.savez(out, **arrays)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        written = WRITTEN_BYTES.get(self.cache_dir)
+        if written is None or written > self.max_bytes * EVICT_FRACTION:
+            self.evict()
+            WRITTEN_BYTES[self.cache_dir] = 0
+        else:
+            WRITTEN_BYTES[self.cache_dir] = written + size
+
+    def evict(self) -> None:
+        '''Removes least recently used entries until the cache fits its size limit'''
+
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError: # evicted by another process
+                    continue
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+
+        cache_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if cache_bytes <= self.max_bytes:
+                break
+            cache_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError: # evicted by another process
+                pass
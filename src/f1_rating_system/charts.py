@@ -0,0 +1,130 @@
+import json
+
+import altair as at
+import pandas as pd
+
+from f1_rating_system import downsample
+
+
+# text colour of chart labels per streamlit theme base
+THEME_TEXT_COLOURS = {"light": "#31333F", "dark": "#FAFAFA"}
+
+# podium colours of the top 3 drivers
+PODIUM_COLOURS = ["#FFD700", "#C0C0C0", "#CD7F32"]
+
+
+def make_rating_bars(df: pd.DataFrame, name_col: str, score_col: str, name_title: str, score_title: str, height: int, text_colour: str) -> at.LayerChart:
+    '''Returns a bar chart of ratings per name in df order, coloured by
+    hex_code and labelled with each rating, with error bars of the
+    score_col + "Lower" and + "Upper" bootstrap bounds where present'''
+
+    lower_col, upper_col = f"{score_col}Lower", f"{score_col}Upper"
+    chart = at.Chart(df).transform_calculate(
+        labelScore=f"isValid(datum.{upper_col}) ? datum.{upper_col} : datum.{score_col}"
+    ).encode(
+        y=at.Y(name_col, sort=None, title=name_title),
+        x=at.X(score_col, stack=None, title=score_title, scale=at.Scale(zero=False)),
+        tooltip=[
+            at.Tooltip(name_col, title=name_title),
+            at.Tooltip(f"{score_col}:Q", format=".0f", title=score_title),
+            at.Tooltip(f"{lower_col}:Q", format=".0f", title="Lower bound"),
+            at.Tooltip(f"{upper_col}:Q", format=".0f", title="Upper bound")
+        ]
+    ).properties(height=height)
+    bars = chart.mark_bar(size=30).encode(
+        color=at.Color("hex_code:N", scale=None)
+    )
+    error_bars = chart.mark_rule(color=text_colour).encode(
+        x=f"{lower_col}:Q",
+        x2=f"{upper_col}:Q"
+    )
+    text = chart.mark_text(color=text_colour, align="left", dx=2).encode(
+        x="labelScore:Q",
+        text=at.Text(f"{score_col}:Q", format=".0f")
+    )
+    return bars + error_bars + text
+
+
+def make_change_bars(df: pd.DataFrame, name_col: str, change_col: str, name_title: str, height: int, text_colour: str) -> at.LayerChart:
+    '''Returns a bar chart of rating changes per name in df order, drawn
+    from the baseline and labelled on the side the bar extends to'''
+
+    chart = at.Chart(df).encode(
+        y=at.Y(name_col, sort=None, title=name_title),
+        x=at.X(change_col, stack=None, title="Rating change", scale=at.Scale(zero=False)),
+        x2="baseline",
+        tooltip=[
+            at.Tooltip(name_col, title=name_title),
+            at.Tooltip(f"{change_col}:Q", format=".0f", title="Rating change")
+        ]
+    ).properties(height=height)
+    bars = chart.mark_bar(size=30).encode(
+        color=at.Color("hex_code:N", scale=None)
+    )
+    text = chart.mark_text(
+        color=text_colour,
+        align=at.expr(at.expr.if_(at.datum[change_col] >= 0, "left", "right")),
+        dx=at.expr(at.expr.if_(at.datum[change_col] >= 0, 2, -2))
+    ).encode(
+        text=at.Text(f"{change_col}:Q", format=".0f"),
+    )
+    return bars + text
+
+
+def make_goat_lines(avg_hist_df: pd.DataFrame, order: list) -> at.LayerChart:
+    '''Returns a line chart of the ratings over time of the top drivers in
+    order, in podium colours, with bands of their bootstrap bounds'''
+
+    scale = at.Scale(domain=order, range=PODIUM_COLOURS)
+    chart = at.Chart(avg_hist_df).encode(
+        x=at.X("date", title="Date"),
+        color=at.Color("driverName", title="Driver name", sort=order, scale=scale)
+    )
+    bands = chart.mark_area(opacity=0.2).encode(
+        y="driverScoreLower:Q",
+        y2="driverScoreUpper:Q"
+    )
+    lines = chart.mark_line().encode(
+        y=at.Y("driverScore", title="Driver rating", scale=at.Scale(zero=False)),
+        tooltip=[
+            at.Tooltip("driverName", title="Driver name"),
+            at.Tooltip("driverScore:Q", format=".0f", title="Driver rating"),
+            at.Tooltip("driverScoreLower:Q", format=".0f", title="Lower bound"),
+            at.Tooltip("driverScoreUpper:Q", format=".0f", title="Upper bound")
+        ]
+    )
+    return bands + lines
+
+
+def make_chart_specs(tables: dict, chart_points: int) -> dict:
+    '''Returns Vega-Lite specs with embedded data of the static app charts
+    per theme base, from the processed tables by data config key'''
+
+    avg_goat_df = tables["avg_goat_path"]
+    order = avg_goat_df.loc[:2, "driverName"].to_list()
+    avg_hist_df = tables["avg_hist_path"][["date", "driverName", "driverScore", "driverScoreLower", "driverScoreUpper"]]
+    goat_hist_df = downsample.downsample_groups(avg_hist_df, "driverName", "date", "driverScore", max(chart_points // max(len(order), 1), 3))
+
+    specs = {}
+    for theme_base, text_colour in THEME_TEXT_COLOURS.items():
+        charts = {
+            "goat": make_rating_bars(avg_goat_df, "driverName", "meanScore", "Driver name", "Mean driver rating", 450, text_colour),
+            "cur_dri": make_rating_bars(tables["cur_dri_path"], "driverName", "driverScore", "Driver", "Rating", 800, text_colour),
+            "dri_imp": make_change_bars(tables["dri_imp_path"], "driverName", "cumDriScoreChange", "Driver", 800, text_colour),
+            "cur_con": make_rating_bars(tables["cur_con_path"], "constructorName", "constructorScore", "Constructor", "Rating", 450, text_colour),
+            "con_imp": make_change_bars(tables["con_imp_path"], "constructorName", "conScoreChange", "Constructor", 450, text_colour),
+            "goat_hist": make_goat_lines(goat_hist_df, order),
+            "goat_hist_full": make_goat_lines(avg_hist_df, order)
+        }
+        specs[theme_base] = {name: chart.to_dict() for name, chart in charts.items()}
+
+    return specs
+
+
+def write_chart_specs(tables: dict, config: dict) -> None:
+    '''Writes Vega-Lite specs of the static app charts to the chart spec
+    path, so app pages render them without rebuilding them'''
+
+    specs = make_chart_specs(tables, config["app"]["chart_points"])
+    with open(config["data"]["chart_spec_path"], "w") as out:
+        json.dump(specs, out)
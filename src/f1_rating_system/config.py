@@ -0,0 +1,30 @@
+import functools
+import os
+import yaml
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# project config, overridable to run against another data directory
+CONFIG_PATH = os.environ.get("F1_RATING_SYSTEM_CONFIG", os.path.join(PROJECT_DIR, "params.yaml"))
+
+
+def load_config(config_path: str = CONFIG_PATH) -> dict:
+    '''Returns params from a config file, with data paths resolved relative
+    to the config file's directory rather than the working directory'''
+
+    with open(config_path) as conf_file:
+        config = yaml.safe_load(conf_file)
+
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+    config["data"] = {
+        key: os.path.join(config_dir, value) if isinstance(value, str) else value
+        for key, value in config["data"].items()
+    }
+    return config
+
+
+@functools.cache
+def get_config() -> dict:
+    '''Returns the project config, loaded once per process'''
+    return load_config()
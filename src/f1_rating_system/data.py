@@ -1,18 +1,20 @@
-import yaml
-
 import pandas as pd
 
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
+from f1_rating_system import storage
+from f1_rating_system.config import get_config
+
+CONFIG = get_config()
 
-def preprocess_data():
+def preprocess_data(config: dict = None) -> None:
     '''Exports preprocessed data to 'interim' data folder for creating
-    features'''
+    features. Uses the project config unless config is given.'''
+
+    config = config or CONFIG
 
     # merge raw data required for scoring
-    results_df = pd.read_csv(CONFIG["data"]["results_csv"])
-    races_df = pd.read_csv(CONFIG["data"]["races_csv"])
-    con_yr_df = pd.read_csv(CONFIG["data"]["constructor_year_csv"])
+    results_df = pd.read_csv(config["data"]["results_csv"])
+    races_df = pd.read_csv(config["data"]["races_csv"])
+    con_yr_df = pd.read_csv(config["data"]["constructor_year_csv"])
     pre_df = races_df.merge(results_df, on="raceId", how="inner", validate="1:m").drop(columns=["raceId"])
     pre_df = pre_df.merge(con_yr_df[["constructorId", "year", "constructorYearId"]], on=["constructorId", "year"], how="left", validate="m:1")
 
@@ -23,7 +25,7 @@ def preprocess_data():
     sort_order = ["year", "round", "position", "grid"]
     pre_df = pre_df[col_order].sort_values(sort_order)
 
-    pre_df.to_csv(CONFIG["data"]["preprocessed_path"], index=False)
+    storage.write_dataset(pre_df, "preprocessed_path", config=config)
 
 
 if __name__=="__main__":
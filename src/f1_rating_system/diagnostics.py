@@ -0,0 +1,63 @@
+import collections
+
+import numpy as np
+
+
+class PredictionDiagnostics():
+    '''Streaming accumulator of pairwise prediction quality. Holds running
+    sums only, so memory stays constant however many pairs are added.'''
+
+    def __init__(self, n_bins: int = 10):
+        self.n_bins = n_bins
+        self.n_pairs = 0
+        self.log_loss_sum = 0.0
+        self.brier_sum = 0.0
+        self.bin_counts = np.zeros(n_bins, dtype=np.int64)
+        self.bin_exp_sums = np.zeros(n_bins)
+        self.bin_act_sums = np.zeros(n_bins)
+        self.era_pairs = collections.Counter()
+        self.era_correct = collections.Counter()
+
+    def update(self, expected: np.ndarray, actual: np.ndarray, era: int) -> None:
+        '''Adds rated pairs of a round, given the expected score of one side
+        of each pair and whether that side won'''
+
+        win_prob = np.where(actual, expected, 1 - expected)
+        self.n_pairs += expected.shape[0]
+        self.log_loss_sum -= np.log(np.maximum(win_prob, 1E-10)).sum()
+        self.brier_sum += ((expected - actual) ** 2).sum()
+
+        # bin both sides of each pair so calibration does not depend on pair order
+        bin_exp = np.concatenate([expected, 1 - expected])
+        bin_act = np.concatenate([actual, ~actual])
+        bin_ixs = np.minimum((bin_exp * self.n_bins).astype(int), self.n_bins - 1)
+        self.bin_counts += np.bincount(bin_ixs, minlength=self.n_bins)
+        self.bin_exp_sums += np.bincount(bin_ixs, weights=bin_exp, minlength=self.n_bins)
+        self.bin_act_sums += np.bincount(bin_ixs, weights=bin_act, minlength=self.n_bins)
+
+        # favourite wins, with even pairs counting as half correct
+        self.era_pairs[era] += expected.shape[0]
+        self.era_correct[era] += ((expected > 0.5) == actual).sum() - 0.5 * (expected == 0.5).sum()
+
+    def get_metrics(self) -> dict:
+        '''Returns log loss, Brier score and accuracy over all pairs, accuracy
+        per era and calibration of expected scores per bin (None if empty)'''
+
+        n_pairs = max(self.n_pairs, 1)
+        return {
+            "pairs": self.n_pairs,
+            "log_loss": float(self.log_loss_sum / n_pairs),
+            "brier_score": float(self.brier_sum / n_pairs),
+            "accuracy": float(sum(self.era_correct.values()) / n_pairs),
+            "accuracy_by_era": {str(era): float(self.era_correct[era] / self.era_pairs[era]) for era in sorted(self.era_pairs)},
+            "calibration": [
+                {
+                    "expected_from": bin_ix / self.n_bins,
+                    "expected_to": (bin_ix + 1) / self.n_bins,
+                    "pairs": int(self.bin_counts[bin_ix]),
+                    "mean_expected": float(self.bin_exp_sums[bin_ix] / self.bin_counts[bin_ix]) if self.bin_counts[bin_ix] else None,
+                    "mean_actual": float(self.bin_act_sums[bin_ix] / self.bin_counts[bin_ix]) if self.bin_counts[bin_ix] else None
+                }
+                for bin_ix in range(self.n_bins)
+            ]
+        }
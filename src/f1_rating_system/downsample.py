@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    '''Returns the indices of n_out points of a series chosen by
+    largest-triangle-three-buckets. The first and last points are kept, and
+    each bucket of points in between keeps the point forming the largest
+    triangle with the previous pick and the mean of the next bucket, which
+    preserves peaks and troughs.'''
+
+    n_in = x.shape[0]
+    if n_out >= n_in or n_out < 3:
+        return np.arange(n_in)
+
+    # split points between the first and last into n_out - 2 buckets
+    edges = np.linspace(1, n_in - 1, n_out - 1).astype(int)
+    ixs = np.empty(n_out, dtype=int)
+    ixs[0], ixs[-1] = 0, n_in - 1
+
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket < n_out - 3:
+            next_x = x[stop:edges[bucket + 2]].mean()
+            next_y = y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        prev_x, prev_y = x[ixs[bucket]], y[ixs[bucket]]
+        areas = np.abs((prev_x - next_x) * (y[start:stop] - prev_y) - (prev_x - x[start:stop]) * (next_y - prev_y))
+        ixs[bucket + 1] = start + np.argmax(areas)
+
+    return ixs
+
+
+def downsample_series(df: pd.DataFrame, x_col: str, y_col: str, n_points: int) -> pd.DataFrame:
+    '''Returns the rows of a date-ordered series kept by LTTB downsampling to
+    n_points points'''
+
+    x = pd.to_datetime(df[x_col]).to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    return df.iloc[lttb(x, df[y_col].to_numpy(dtype=float), n_points)].reset_index(drop=True)
+
+
+def downsample_groups(df: pd.DataFrame, group_col: str, x_col: str, y_col: str, n_points: int) -> pd.DataFrame:
+    '''Returns each group's series of a frame downsampled to n_points points'''
+
+    group_dfs = [downsample_series(group_df, x_col, y_col, n_points) for _, group_df in df.groupby(group_col, sort=False)]
+    return pd.concat(group_dfs, ignore_index=True) if group_dfs else df
@@ -1,11 +1,10 @@
-import yaml
-
-import numpy as np
 import pandas as pd
 
+from f1_rating_system import storage
+from f1_rating_system.config import get_config
+
 
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
+CONFIG = get_config()
     
 CONSTRUCTOR_STATUSES = [
     "engine", "transmission", "clutch", "electrical", "hydraulics", "gearbox", "radiator", 
@@ -46,16 +45,16 @@ POINTS_MAP = {
     10: 1
 }
 
-def create_features():
+def create_features(config: dict = None) -> None:
     '''Exports features data to 'interim' data folder for creating
-    model'''
+    model. Uses the project config unless config is given.'''
+
+    config = config or CONFIG
 
-    pre_df = pd.read_csv(CONFIG["data"]["preprocessed_path"])
+    pre_df = storage.read_dataset("preprocessed_path", config=config)
 
     # impute constructor-year id if doesn't exist
-    pre_df["constructorYearId"] = pre_df[["constructorId", "constructorYearId"]].apply(
-        lambda row: row.iloc[1] if not np.isnan(row.iloc[1]) else row.iloc[0]
-    , axis=1).astype(int)
+    pre_df["constructorYearId"] = pre_df["constructorYearId"].fillna(pre_df["constructorId"]).astype(int)
 
     # infer positions for non-finishers using qualifying position 
     car_df = pre_df[["year", "round", "grid"]].drop_duplicates()
@@ -66,16 +65,22 @@ def create_features():
     cle_df["mapPoints"] = cle_df["mapPosition"].map(POINTS_MAP).fillna(0)
 
     # relabel race finish status
-    sta_df = pd.read_csv(CONFIG["data"]["status_csv"])
-    cle_df = cle_df.merge(sta_df, on="statusId", how="left")
-    cle_df["status"] = cle_df["status"].apply(str.lower)
-    cle_df["status"] = cle_df["status"].apply(map_status)
+    status_map = get_status_map(pd.read_csv(config["data"]["status_csv"]))
+    status_dtype = pd.CategoricalDtype(status_map.unique())
+    cle_df["status"] = cle_df["statusId"].map(status_map).astype(status_dtype)
 
     # remove columns no longer needed
     cle_df = cle_df.drop(columns=["grid", "position", "statusId"])
 
     # export data
-    cle_df.to_csv(CONFIG["data"]["features_path"], index=False)
+    storage.write_dataset(cle_df, "features_path", config=config)
+
+def get_status_map(sta_df: pd.DataFrame) -> pd.Series:
+    '''Returns race status category lookup table indexed by status id'''
+
+    statuses = sta_df["status"].str.lower().map(map_status)
+    return pd.Series(statuses.to_numpy(), index=sta_df["statusId"].to_numpy())
+
 
 def map_status(status: str) -> str:
 
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from f1_rating_system import model, storage
+
+
+# statuses excluding a teammate pair from their head-to-head record, as in
+# the model's driver pairs
+UNRATED_STATUSES = ["constructor retirement", "misc retirement"]
+
+
+def get_win_probs(rating_system: model.RatingBackend, ratings: np.ndarray) -> np.ndarray:
+    '''Returns the float16 win probability matrix of every rating (rows)
+    over every other rating (columns)'''
+    return rating_system.get_win_prob_matrix(np.asarray(ratings, dtype=float)).astype(np.float16)
+
+
+def make_head_to_head(res_df: pd.DataFrame, rating_system: model.RatingBackend) -> dict:
+    '''Returns win probability matrices of the current grid's drivers in
+    their current cars and in the same car, and of all drivers in the same
+    car at their peak ratings, with the driver ids indexing their rows and
+    columns and the names to display them by'''
+
+    cur_yr_df = res_df[res_df["year"] == res_df["year"].max()]
+    grid_df = cur_yr_df[cur_yr_df["round"] == cur_yr_df["round"].max()].drop_duplicates("driverId")
+    grid_df = grid_df.sort_values("driverScore", ascending=False)
+    grid_rtg = rating_system.get_combo_rating(grid_df["driverScore"].to_numpy(), grid_df["constructorScore"].to_numpy())
+
+    # a shared car cancels out of the combined ratings, leaving driver ratings
+    peak_df = res_df.groupby("driverId").agg(driverName=("driverName", "first"), peakScore=("driverScore", "max"))
+    peak_df = peak_df.sort_values("peakScore", ascending=False).reset_index()
+
+    return {
+        "grid_ids": grid_df["driverId"].to_numpy(),
+        "grid_names": grid_df["driverName"].to_numpy(dtype=str),
+        "grid_constructors": grid_df["constructorName"].to_numpy(dtype=str),
+        "grid_win_prob": get_win_probs(rating_system, grid_rtg),
+        "same_car_win_prob": get_win_probs(rating_system, grid_df["driverScore"].to_numpy()),
+        "driver_ids": peak_df["driverId"].to_numpy(),
+        "driver_names": peak_df["driverName"].to_numpy(dtype=str),
+        "peak_scores": peak_df["peakScore"].to_numpy(),
+        "peak_win_prob": get_win_probs(rating_system, peak_df["peakScore"].to_numpy())
+    }
+
+
+def make_teammates(res_df: pd.DataFrame) -> pd.DataFrame:
+    '''Returns the head-to-head record and rating gaps of every pair of
+    teammates per constructor-year, once from each driver's side, counting
+    races both rated drivers finished in different positions'''
+
+    cols = ["year", "round", "constructorYearId", "constructorName", "driverId", "driverName", "mapPosition", "driverScore"]
+    rated_df = res_df.loc[~res_df["status"].isin(UNRATED_STATUSES), cols]
+    pair_df = rated_df.merge(rated_df, on=["year", "round", "constructorYearId", "constructorName"], suffixes=("A", "B"))
+    pair_df = pair_df[(pair_df["driverIdA"] != pair_df["driverIdB"]) & (pair_df["mapPositionA"] != pair_df["mapPositionB"])]
+    pair_df = pair_df.sort_values(["year", "round"]).assign(
+        wins=pair_df["mapPositionA"] < pair_df["mapPositionB"],
+        ratingGap=pair_df["driverScoreA"] - pair_df["driverScoreB"]
+    )
+
+    teammates_df = pair_df.groupby(["driverIdA", "driverIdB", "year", "constructorYearId"]).agg(
+        driverNameA=("driverNameA", "first"),
+        driverNameB=("driverNameB", "first"),
+        constructorName=("constructorName", "first"),
+        races=("wins", "size"),
+        wins=("wins", "sum"),
+        meanGap=("ratingGap", "mean"),
+        finalGap=("ratingGap", "last")
+    ).reset_index()
+    teammates_df["losses"] = teammates_df["races"] - teammates_df["wins"]
+    return teammates_df[list(storage.TEAMMATES_SCHEMA)]
+
+
+def write_head_to_head(res_df: pd.DataFrame, rating_system: model.RatingBackend, config: dict) -> None:
+    '''Writes the win probability matrices to the head-to-head path and the
+    teammate records to the teammates path'''
+
+    np.savez_compressed(config["data"]["h2h_path"], **make_head_to_head(res_df, rating_system))
+    storage.write_dataset(make_teammates(res_df), "teammates_path", config=config)
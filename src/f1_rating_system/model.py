@@ -1,47 +1,243 @@
-import itertools
+import collections
+import hashlib
 import json
+import time
 import yaml
 
 import numpy as np
 import pandas as pd
 from scipy import optimize
 
+from f1_rating_system import profiling, storage
+from f1_rating_system.cache import ResultCache
+from f1_rating_system.config import get_config
+from f1_rating_system.diagnostics import PredictionDiagnostics
+
 
 # global variables
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
-
-# column indexes
-CON_IX = 4 # constructor id
-DRI_IX = 5 # driver id
-POS_IX = 6 # driver position
-STA_IX = 8 # race status
-CSC_IX = 9 # new constructor score
-DSC_IX = 10 # new driver score
-EXP_IX = 11 # expected outcome
-TRU_IX = 12 # true outcome
-
-MOD_DF = pd.read_csv(CONFIG["data"]["features_path"])
-MOD_DF[["constructorScore", "driverScore", "expected", "actual"]] = None
-IX_CHUNKS = MOD_DF.reset_index().groupby(["year", "round"])["index"].agg(["min", "max"]).values
-MOD_MAT = MOD_DF.values
-
-DRI_RTG = {dri: CONFIG["model"]["start_score"] for dri in set(MOD_DF["driverId"])}
-CON_RTG = {con: CONFIG["model"]["start_score"] for con in set(MOD_DF["constructorYearId"])}
-
-class customRatingSystem():
+CONFIG = get_config()
+
+# model parameters of the elo backend, in the order passed to model_data
+PARAM_NAMES = ["c", "w", "player_learning_rate", "team_learning_rate"]
+
+# race status codes, other statuses are coded as -1
+STATUS_CODES = {
+    "finished": 0,
+    "driver retirement": 1,
+    "constructor retirement": 2,
+    "misc retirement": 3
+}
+
+# precomputed, parameter-independent structure of a round
+RoundData = collections.namedtuple("RoundData", [
+    "start", "stop", "dri_rows", "con_rows", "dri_ixs", "dri_inv", "dri_group", "con_ixs", "con_inv",
+    "con_group", "outcome", "won", "dri_pair", "con_pair", "dri_n", "con_n", "dri_act", "pair_counts"
+])
+
+# pair counts of a round, as rated pairs and pairs skipped per reason
+PAIR_COUNT_NAMES = ["rated", "same_car", "misc_retirement"]
+
+
+class ModelData():
+    '''Compact model inputs with drivers and constructor-years remapped to
+    dense 0..N indices, integer status codes, contiguous rating arrays and
+    preallocated, typed output columns'''
+
+    def __init__(self, features_df: pd.DataFrame, init_state: dict = None):
+        '''init_state optionally holds ratings to start from instead of the
+        start score, keyed as in a model checkpoint'''
+
+        self.features_df = features_df
+        self.init_state = init_state
+        dri_ids = features_df["driverId"].to_numpy()
+        con_ids = features_df["constructorYearId"].to_numpy()
+
+        if init_state is not None:
+            dri_ids = np.concatenate([dri_ids, init_state["dri_ids"]])
+            con_ids = np.concatenate([con_ids, init_state["con_ids"]])
+
+        self.dri_ids = np.unique(dri_ids)
+        self.con_ids = np.unique(con_ids)
+        self.dri_rows = np.searchsorted(self.dri_ids, features_df["driverId"].to_numpy()).astype(np.int32)
+        self.con_rows = np.searchsorted(self.con_ids, features_df["constructorYearId"].to_numpy()).astype(np.int32)
+        self.positions = features_df["mapPosition"].to_numpy(dtype=float)
+
+        self.statuses = get_status_codes(features_df["status"])
+
+        ix_chunks = features_df.reset_index().groupby(["year", "round"])["index"].agg(["min", "max"]).values
+        self.rounds = [self.get_round(start_ix, end_ix + 1) for start_ix, end_ix in ix_chunks]
+
+        # rating state arrays per candidate params by backend state name, reset
+        # at the start of every evaluation
+        self.state = {}
+
+        # output columns per candidate params
+        self.allocate_outputs(1)
+
+        # replay counters
+        self.n_replays = 0
+        self.n_evals = 0
+        self.round_secs = np.zeros(len(self.rounds))
+
+    def get_round(self, start: int, stop: int) -> RoundData:
+        '''Returns the pairwise masks and index maps for the rows of a round'''
+        return get_round_data(
+            self.dri_rows[start:stop], self.con_rows[start:stop], self.positions[start:stop],
+            self.statuses[start:stop], start
+        )
+
+    def reset(self, start_score: float, model: "RatingBackend", n_cand: int = 1) -> dict:
+        '''Resets and returns the backend's state arrays, shaped (candidates,
+        drivers) for "dri_" and (candidates, constructors) for "con_" names.
+        State in the init_state overrides the backend's starting state.'''
+
+        n_ids = {"dri": self.dri_ids.shape[0], "con": self.con_ids.shape[0]}
+        if list(self.state) != model.state_names or self.state[model.state_names[0]].shape[0] != n_cand:
+            self.state = {name: np.empty((n_cand, n_ids[name[:3]])) for name in model.state_names}
+
+        model.reset_state(self.state, start_score)
+
+        if self.init_state is not None:
+            for name, arr in self.state.items():
+                if name in self.init_state:
+                    arr[:, np.searchsorted(getattr(self, f"{name[:3]}_ids"), self.init_state[f"{name[:3]}_ids"])] = self.init_state[name]
+
+        return self.state
+
+    def allocate_outputs(self, n_cand: int) -> None:
+        '''Allocates (candidates, rows) output columns if not already sized'''
+
+        if getattr(self, "dri_scores", None) is None or self.dri_scores.shape[0] != n_cand:
+            n_rows = self.features_df.shape[0]
+            self.con_scores = np.empty((n_cand, n_rows))
+            self.dri_scores = np.empty((n_cand, n_rows))
+            self.expected = np.empty((n_cand, n_rows))
+            self.actual = np.empty((n_cand, n_rows), dtype=np.int64)
+
+    def get_hash(self) -> str:
+        '''Returns a content hash of the model inputs'''
+
+        data_hash = hashlib.sha256()
+        for arr in [self.dri_ids, self.con_ids, self.dri_rows, self.con_rows, self.positions, self.statuses]:
+            data_hash.update(np.ascontiguousarray(arr).tobytes())
+
+        if self.init_state is not None:
+            for key in sorted(key for key in self.init_state if key.startswith(("dri_", "con_"))):
+                data_hash.update(np.ascontiguousarray(self.init_state[key]).tobytes())
+
+        data_hash.update(np.array([rnd.start for rnd in self.rounds]).tobytes())
+        return data_hash.hexdigest()
+
+    def get_stats(self, top_n: int = 10) -> dict:
+        '''Returns replay counters: candidate evaluations, pairs rated and
+        skipped per evaluation, and replay time per decade and of the slowest
+        rounds'''
+
+        pair_counts = np.sum([rnd.pair_counts for rnd in self.rounds], axis=0)
+        starts = [rnd.start for rnd in self.rounds]
+        round_df = self.features_df.iloc[starts][["year", "round"]].reset_index(drop=True).assign(
+            rows=[rnd.stop - rnd.start for rnd in self.rounds],
+            pairs=[int(rnd.pair_counts[0]) for rnd in self.rounds],
+            secs=self.round_secs
+        )
+        decade_secs = round_df.groupby(round_df["year"] // 10 * 10)["secs"].sum()
+
+        return {
+            "replays": self.n_replays,
+            "evaluations": self.n_evals,
+            "pairs_per_evaluation": dict(zip(PAIR_COUNT_NAMES, pair_counts.tolist())),
+            "rounds": len(self.rounds),
+            "round_secs": float(self.round_secs.sum()),
+            "round_secs_by_decade": {str(decade): float(secs) for decade, secs in decade_secs.items()},
+            "slowest_rounds": round_df.nlargest(top_n, "secs").astype({"year": int, "round": int}).to_dict("records")
+        }
+
+    def get_state(self, cand_ix: int = 0) -> dict:
+        '''Returns a candidate's current state arrays keyed as in a model
+        checkpoint'''
+
+        return {"dri_ids": self.dri_ids, "con_ids": self.con_ids} | {name: arr[cand_ix].copy() for name, arr in self.state.items()}
+
+    def to_frame(self, cand_ix: int = 0) -> pd.DataFrame:
+        '''Returns the features with the modelled output columns of a candidate'''
+        return self.features_df.assign(
+            constructorScore=self.con_scores[cand_ix],
+            driverScore=self.dri_scores[cand_ix],
+            expected=self.expected[cand_ix],
+            actual=self.actual[cand_ix]
+        )
+
+
+class RatingBackend():
+    '''Interface of the rating systems the round engine replays (see
+    replay). Params are held as (candidates, 1) arrays so one instance rates
+    every candidate, and state arrays are (candidates, drivers) or
+    (candidates, constructors) arrays named by state_names. Backends hold
+    the C-factor c and driver-constructor weight w that rate combined
+    driver-constructors.'''
+
+    # backend name in the model config
+    name = None
+
+    # params in the order passed to model_data, their starting values for
+    # fitting and their (min, max) fitting bounds
+    param_names = []
+    default_params = []
+    param_bounds = None
+
+    # state arrays, with the driver and constructor ratings first
+    state_names = ["dri_rtg", "con_rtg"]
+
+    # whether replay can carry analytic gradients of the backend's params
+    has_jac = False
+
+    def get_combo_rating(self, player_rating: np.ndarray, team_rating: np.ndarray) -> np.ndarray:
+        '''Returns the combined rating of team and player'''
+        return player_rating + (self.w * team_rating)
+
+    def get_win_prob_matrix(self, ratings: np.ndarray) -> np.ndarray:
+        '''Returns the win probability of every driver-constructor (rows) over
+        every other driver-constructor (columns) at their point ratings.
+        Ratings and params may carry a leading candidates axis.'''
+        rating_gaps = ratings[..., :, None] - ratings[..., None, :]
+        return 1 / (1 + np.exp(-rating_gaps / np.expand_dims(self.c, -1)))
+
+    def reset_state(self, state: dict, start_score: float) -> None:
+        '''Fills the state arrays with their starting values in place'''
+
+        for arr in state.values():
+            arr.fill(start_score)
+
+    def get_round_expected(self, rnd: "RoundData", state: dict) -> tuple:
+        '''Returns the combined ratings of a round's rows and the expected score
+        of every pair, mirrored so that the expected scores of a pair sum to 1'''
+        raise NotImplementedError
+
+    def update_round(self, rnd: "RoundData", state: dict, exp_mat: np.ndarray, pair_weights: np.ndarray = None) -> None:
+        '''Applies a round's outcomes to the state arrays in place, weighting
+        pairs per candidate by pair_weights if given'''
+        raise NotImplementedError
+
+
+class customRatingSystem(RatingBackend):
     '''Custom rating system for F1 drivers and constructors'''
 
+    name = "elo"
+    param_names = PARAM_NAMES
+    default_params = [
+        400, # C-factor - sensitivity of expected outcome
+        0.5, # Driver-constructor weight
+        32,  # player learning rate
+        32   # team learning rate
+    ]
+    has_jac = True
+
     def __init__(self, c: float, w: float, player_learning_rate: float, team_learning_rate: float):
         self.c = c
         self.w = w
         self.player_lr = player_learning_rate
         self.team_lr = team_learning_rate
 
-    def get_combo_rating(self, player_rating: float, team_rating: float) -> float:
-        '''Returns the combined rating of team and player'''
-        return player_rating + (self.w * team_rating)
-
     def get_win_prob(self, rating_a: float, rating_b: float) -> float:
         '''Returns the win probability of driver-constructor A over driver-constructor B'''
         return 1 / (1 + np.exp(-(rating_a - rating_b) / self.c))
@@ -54,127 +250,768 @@ class customRatingSystem():
         '''Returns updated team rating'''
         return self.team_lr * rating_change
 
+    def get_round_expected(self, rnd: "RoundData", state: dict) -> tuple:
+        return get_expected_scores(self, rnd, state["dri_rtg"], state["con_rtg"])
 
-def model_data(params: dict, export: bool = False) -> float:
-    '''Returns mean negative log likelihood of the rating system. If
-    export = True, also exports results for data reporting.'''
+    def update_round(self, rnd: "RoundData", state: dict, exp_mat: np.ndarray, pair_weights: np.ndarray = None) -> None:
+        dri_diff, con_diff = get_score_diffs(rnd, exp_mat, pair_weights)
+        update_ratings(self, rnd, dri_diff, con_diff, state["dri_rtg"], state["con_rtg"], pair_weights)
 
-    dri_scores = DRI_RTG.copy()
-    con_scores = CON_RTG.copy()
-    exp, out = [], []
-    log_likelihood = 0
-    n_pred = 0
-    model = customRatingSystem(params[0], params[1], params[2], params[3])
 
-    for start_ix, end_ix in IX_CHUNKS:
-        yr_mat = MOD_MAT[start_ix:end_ix+1]
+class GlickoRatingSystem(RatingBackend):
+    '''Glicko-2-style rating system for F1 drivers and constructors, with a
+    rating deviation (RD) per driver and constructor-year. Pair win
+    probabilities are damped by the pair's combined RD, and a round moves
+    each rating by the information its pairs carry, so uncertain ratings
+    move further and settle as they are rated. RDs inflate by a fixed
+    volatility every round an entity races, up to the starting RD. Win
+    probability matrices use point ratings, without RD damping.'''
 
-        rnd_dri_scores = {dri: {"diff": 0, "n": 0, "exp": 0, "act": 0} for dri in yr_mat[:, DRI_IX]}
-        rnd_con_scores = {con: {"diff": 0, "n": 0, "exp": 0, "act": 0} for con in yr_mat[:, CON_IX]}
+    name = "glicko"
+    param_names = ["c", "w", "volatility", "start_rd"]
+    default_params = [
+        400, # C-factor - sensitivity of expected outcome
+        0.5, # Driver-constructor weight
+        20,  # RD added per round raced
+        200  # RD of new drivers and constructor-years
+    ]
+    param_bounds = [(1, None), (0, None), (0, None), (1, None)]
+    state_names = ["dri_rtg", "con_rtg", "dri_rd", "con_rd"]
 
-        for ix_1, ix_2 in itertools.combinations(range(yr_mat.shape[0]), 2):
-            con_a, dri_a, pos_a, st_a = yr_mat[ix_1, [CON_IX, DRI_IX, POS_IX, STA_IX]]
-            con_b, dri_b, pos_b, st_b = yr_mat[ix_2, [CON_IX, DRI_IX, POS_IX, STA_IX]]
-    
-            # continue if drivers in same car or a driver does not finish for misc reason
-            if pos_a == pos_b or "misc retirement" in [st_a, st_b]:
-                continue
-
-            # get current rating
-            elo_a = model.get_combo_rating(dri_scores[dri_a], con_scores[con_a])
-            elo_b = model.get_combo_rating(dri_scores[dri_b], con_scores[con_b])
-            
-            # create expected scores
-            e_a = model.get_win_prob(elo_a, elo_b)
-            e_b = 1 - e_a
-
-            # create true scores and track log likelihood 
-            if pos_a < pos_b:
-                o_a = 1
-                o_b = 0
-                log_likelihood += np.log(max(e_a, 1E-10))
+    def __init__(self, c: float, w: float, volatility: float, start_rd: float):
+        self.c = c
+        self.w = w
+        self.volatility = volatility
+        self.start_rd = start_rd
 
-            else:
-                o_a = 0
-                o_b = 1
-                log_likelihood += np.log(max(e_b, 1E-10))
-
-            n_pred += 1
-                
-            # calculate score change and update round scores
-            diff_a = o_a - e_a
-            diff_b = -diff_a
-
-            # log driver results and changes if neither retire due to car failure (not attributable to drivers)
-            if "constructor retirement" not in [st_a, st_b]:
-                rnd_dri_scores[dri_a]["exp"] += e_a
-                rnd_dri_scores[dri_a]["act"] += o_a
-                rnd_dri_scores[dri_a]["diff"] += diff_a
-                rnd_dri_scores[dri_a]["n"] += 1
-
-                rnd_dri_scores[dri_b]["exp"] += e_b
-                rnd_dri_scores[dri_b]["act"] += o_b
-                rnd_dri_scores[dri_b]["diff"] += diff_b
-                rnd_dri_scores[dri_b]["n"] += 1
-            
-            # log constructor changes if diff constructors and neither driver retires due to driver error (not attributable to constructors)
-            if con_a != con_b and "driver retirement" not in [st_a, st_b]:
-                rnd_con_scores[con_a]["diff"] += diff_a
-                rnd_con_scores[con_a]["n"] += 1
-    
-                rnd_con_scores[con_b]["diff"] += diff_b
-                rnd_con_scores[con_b]["n"] += 1
-                
-            # store expected and final values for error analysis
-            exp += [e_a, e_b]
-            out += [o_a, o_b]
-        
-        # update driver values for finishing drivers and driver-caused retirements
-        for dri in rnd_dri_scores.keys():
-            if rnd_dri_scores[dri]["n"] != 0: # more than 1 car on grid
-                dri_scores[dri] += model.get_driver_rating_change(rnd_dri_scores[dri]["diff"] / rnd_dri_scores[dri]["n"])
-
-        yr_mat[:, DSC_IX] = list(map(lambda el: dri_scores[el], yr_mat[:, DRI_IX])) # driver score
-        yr_mat[:, EXP_IX] = list(map(lambda el: rnd_dri_scores[el]["exp"], yr_mat[:, DRI_IX])) # expected outcome
-        yr_mat[:, TRU_IX] = list(map(lambda el: rnd_dri_scores[el]["act"], yr_mat[:, DRI_IX])) # actual outcome
-
-        # update constructor values for finishing drivers
-        for con in rnd_con_scores.keys():
-            if rnd_con_scores[con]["n"] != 0: # more than 1 car on grid
-                con_scores[con] += model.get_team_rating_change(rnd_con_scores[con]["diff"] / rnd_con_scores[con]["n"])
-        
-        yr_mat[:, CSC_IX] = list(map(lambda el: con_scores[el], yr_mat[:, CON_IX]))
+    def get_rd_damping(self, rd_sq: np.ndarray) -> np.ndarray:
+        '''Returns the Glicko g-factor of squared RDs, in rating units'''
+        return 1 / np.sqrt(1 + 3 * rd_sq / (np.pi * np.expand_dims(self.c, -1)) ** 2)
+
+    def reset_state(self, state: dict, start_score: float) -> None:
+        for name in ["dri_rtg", "con_rtg"]:
+            state[name].fill(start_score)
+        for name in ["dri_rd", "con_rd"]:
+            state[name][:] = self.start_rd
+
+    def get_pair_damping(self, rnd: "RoundData", state: dict) -> np.ndarray:
+        '''Returns the g-factor of every pair of a round's rows, from their
+        summed combined RD'''
+
+        combo_rd_sq = state["dri_rd"][:, rnd.dri_rows] ** 2 + (self.w * state["con_rd"][:, rnd.con_rows]) ** 2
+        return self.get_rd_damping(combo_rd_sq[:, :, None] + combo_rd_sq[:, None, :])
+
+    def get_round_expected(self, rnd: "RoundData", state: dict) -> tuple:
+        elo = self.get_combo_rating(state["dri_rtg"][:, rnd.dri_rows], state["con_rtg"][:, rnd.con_rows])
+        rating_gaps = elo[:, :, None] - elo[:, None, :]
+        exp_mat = 1 / (1 + np.exp(-self.get_pair_damping(rnd, state) * rating_gaps / np.expand_dims(self.c, -1)))
+        return elo, np.triu(exp_mat, k=1) + np.tril(1 - exp_mat.swapaxes(1, 2), k=-1)
+
+    def update_round(self, rnd: "RoundData", state: dict, exp_mat: np.ndarray, pair_weights: np.ndarray = None) -> None:
+        # damped score differences and fisher information of each entity's pairs
+        damping = self.get_pair_damping(rnd, state)
+        info_mat = damping ** 2 * exp_mat * (1 - exp_mat) / np.expand_dims(self.c, -1) ** 2
+        if pair_weights is not None:
+            damping = damping * pair_weights
+            info_mat = info_mat * pair_weights
+
+        dri_diff, con_diff = get_score_diffs(rnd, exp_mat, damping)
+        dri_info = (info_mat * rnd.dri_pair).sum(axis=2) @ rnd.dri_group
+        con_info = (info_mat * rnd.con_pair).sum(axis=2) @ rnd.con_group * self.w ** 2
+
+        for kind, ixs, diff, info, slope in [("dri", rnd.dri_ixs, dri_diff, dri_info, 1), ("con", rnd.con_ixs, con_diff, con_info, self.w)]:
+            rtg, rd = state[f"{kind}_rtg"], state[f"{kind}_rd"]
+            pre_rd_sq = np.minimum(rd[:, ixs] ** 2 + self.volatility ** 2, self.start_rd ** 2)
+            post_rd_sq = 1 / (1 / pre_rd_sq + info)
+            rtg[:, ixs] += post_rd_sq * slope * diff / self.c
+            rd[:, ixs] = np.sqrt(post_rd_sq)
+
+
+# rating backends by name in the model config
+BACKENDS = {backend.name: backend for backend in [customRatingSystem, GlickoRatingSystem]}
+
+
+def get_backend(config: dict = None) -> type:
+    '''Returns the rating backend class configured for the model'''
+
+    config = config or CONFIG
+    return BACKENDS[config["model"]["backend"]]
+
+
+def get_status_codes(statuses: pd.Series) -> np.ndarray:
+    '''Returns race statuses as int8 status codes'''
+
+    # statuses may already be coded, e.g. when attached from shared memory
+    if not pd.api.types.is_numeric_dtype(statuses):
+        statuses = statuses.astype(object).map(STATUS_CODES).fillna(-1)
+    return statuses.to_numpy(dtype=np.int8)
+
+
+def get_round_data(dri_rows: np.ndarray, con_rows: np.ndarray, positions: np.ndarray, statuses: np.ndarray, start: int = 0) -> RoundData:
+    '''Returns the pairwise masks and index maps for the rows of a round,
+    given their driver and constructor rating indices, positions and status
+    codes, with start as the index of the round's first row'''
+
+    stop = start + positions.shape[0]
+    dri_ixs, dri_inv = np.unique(dri_rows, return_inverse=True)
+    con_ixs, con_inv = np.unique(con_rows, return_inverse=True)
+    outcome, pair, dri_pair, con_pair = get_round_masks(con_rows, positions, statuses)
+
+    # count each unordered pair once, skipped for the first rule excluding it
+    upper = np.triu(np.ones(pair.shape, dtype=bool), k=1)
+    same_car = upper & (positions[:, None] == positions[None, :])
+    misc = statuses == STATUS_CODES["misc retirement"]
+    misc_ret = upper & ~same_car & (misc[:, None] | misc[None, :])
+
+    # one-hot maps summing row values per driver and constructor in the round
+    dri_group = (dri_inv[:, None] == np.arange(dri_ixs.shape[0])[None, :]).astype(float)
+    con_group = (con_inv[:, None] == np.arange(con_ixs.shape[0])[None, :]).astype(float)
+
+    return RoundData(
+        start=start, stop=stop, dri_rows=dri_rows, con_rows=con_rows,
+        dri_ixs=dri_ixs, dri_inv=dri_inv, dri_group=dri_group,
+        con_ixs=con_ixs, con_inv=con_inv, con_group=con_group,
+        outcome=outcome, won=pair & outcome, dri_pair=dri_pair, con_pair=con_pair,
+        dri_n=dri_pair.sum(axis=1) @ dri_group,
+        con_n=con_pair.sum(axis=1) @ con_group,
+        dri_act=(outcome & dri_pair).sum(axis=1) @ dri_group,
+        pair_counts=np.array([(upper & pair).sum(), same_car.sum(), misc_ret.sum()])
+    )
+
+
+def get_round_masks(con_ids: np.ndarray, positions: np.ndarray, statuses: np.ndarray) -> tuple:
+    '''Returns the pairwise masks for a round as (outcome, pair, driver,
+    constructor) boolean matrices. Entry [i, j] of the outcome matrix is
+    True if row i beats row j, the pair mask flags pairs that are rated and
+    the driver and constructor masks flag rated pairs that update driver and
+    constructor ratings respectively.'''
+
+    n_rows = positions.shape[0]
+    upper = np.triu(np.ones((n_rows, n_rows), dtype=bool), k=1)
+
+    # row i beats row j if ahead of it, mirrored so outcomes are antisymmetric
+    ahead = positions[:, None] < positions[None, :]
+    outcome = np.where(upper, ahead, ~ahead.T)
+
+    # skip drivers in same car or a driver that does not finish for misc reason
+    misc = statuses == STATUS_CODES["misc retirement"]
+    pair = (positions[:, None] != positions[None, :]) & ~(misc[:, None] | misc[None, :])
+    np.fill_diagonal(pair, False)
+
+    # driver results only count if neither retires due to car failure (not attributable to drivers)
+    con_ret = statuses == STATUS_CODES["constructor retirement"]
+    dri_pair = pair & ~(con_ret[:, None] | con_ret[None, :])
+
+    # constructor results only count if diff constructors and neither driver retires due to driver error
+    dri_ret = statuses == STATUS_CODES["driver retirement"]
+    con_pair = pair & (con_ids[:, None] != con_ids[None, :]) & ~(dri_ret[:, None] | dri_ret[None, :])
+
+    return outcome, pair, dri_pair, con_pair
+
+
+def sum_pair_grads(weights: np.ndarray, elo: np.ndarray, elo_grad: np.ndarray, c: np.ndarray) -> np.ndarray:
+    '''Returns the weighted row sums of the gradient of (elo[i] - elo[j]) / c
+    with respect to the model parameters, given the gradient of each row's
+    combined rating. Arrays carry a leading candidates axis.'''
+
+    row_grads = weights.sum(axis=-1)[..., None] * elo_grad - weights @ elo_grad
+    row_grads[..., 0] -= (weights * (elo[..., :, None] - elo[..., None, :])).sum(axis=-1) / c
+    return row_grads / c[..., None]
+
+
+def get_expected_scores(model: customRatingSystem, rnd: RoundData, dri_rtg: np.ndarray, con_rtg: np.ndarray) -> tuple:
+    '''Returns the combined ratings of a round's rows and the expected score
+    of every pair, mirrored so that the expected scores of a pair sum to 1'''
+
+    elo = model.get_combo_rating(dri_rtg[:, rnd.dri_rows], con_rtg[:, rnd.con_rows])
+    exp_mat = model.get_win_prob_matrix(elo)
+    return elo, np.triu(exp_mat, k=1) + np.tril(1 - exp_mat.swapaxes(1, 2), k=-1)
+
+
+def get_pair_weights(rng: np.random.Generator, n_cand: int, n_rows: int) -> np.ndarray:
+    '''Returns (candidates, rows, rows) symmetric Poisson(1) weights of the
+    pairs of a round, resampling its pairs independently per candidate'''
+
+    weights = np.triu(rng.poisson(1.0, size=(n_cand, n_rows, n_rows)), k=1).astype(float)
+    return weights + weights.swapaxes(1, 2)
+
+
+def get_score_diffs(rnd: RoundData, exp_mat: np.ndarray, pair_weights: np.ndarray = None) -> tuple:
+    '''Returns actual minus expected scores of a round summed per driver and
+    per constructor over the pairs that update them, weighted per candidate
+    by pair_weights if given'''
+
+    diff_mat = rnd.outcome - exp_mat
+    if pair_weights is not None:
+        diff_mat = diff_mat * pair_weights
+
+    dri_diff = (diff_mat * rnd.dri_pair).sum(axis=2) @ rnd.dri_group
+    con_diff = (diff_mat * rnd.con_pair).sum(axis=2) @ rnd.con_group
+    return dri_diff, con_diff
+
+
+def update_ratings(
+    model: customRatingSystem, rnd: RoundData, dri_diff: np.ndarray, con_diff: np.ndarray, dri_rtg: np.ndarray, con_rtg: np.ndarray,
+    pair_weights: np.ndarray = None
+) -> None:
+    '''Applies a round's mean score differences to the driver and
+    constructor ratings in place, as means over the weighted pairs of each
+    candidate if pair_weights are given'''
+
+    if pair_weights is not None:
+        dri_n = (rnd.dri_pair * pair_weights).sum(axis=2) @ rnd.dri_group
+        con_n = (rnd.con_pair * pair_weights).sum(axis=2) @ rnd.con_group
+        dri_mean = np.divide(dri_diff, dri_n, out=np.zeros_like(dri_diff), where=dri_n != 0)
+        con_mean = np.divide(con_diff, con_n, out=np.zeros_like(con_diff), where=con_n != 0)
+        dri_rtg[:, rnd.dri_ixs] += model.get_driver_rating_change(dri_mean)
+        con_rtg[:, rnd.con_ixs] += model.get_team_rating_change(con_mean)
+        return
+
+    dri_rated = rnd.dri_n != 0 # more than 1 car on grid
+    con_rated = rnd.con_n != 0
+
+    # update driver values for finishing drivers and driver-caused retirements
+    dri_rtg[:, rnd.dri_ixs[dri_rated]] += model.get_driver_rating_change(dri_diff[:, dri_rated] / rnd.dri_n[dri_rated])
+
+    # update constructor values for finishing drivers
+    con_rtg[:, rnd.con_ixs[con_rated]] += model.get_team_rating_change(con_diff[:, con_rated] / rnd.con_n[con_rated])
+
+
+def get_round_outputs(rnd: RoundData, exp_mat: np.ndarray, dri_rtg: np.ndarray, con_rtg: np.ndarray) -> tuple:
+    '''Returns the driver scores, constructor scores, expected outcomes and
+    actual outcomes of a round's rows after its rating updates'''
+
+    dri_exp = (exp_mat * rnd.dri_pair).sum(axis=2) @ rnd.dri_group
+    actual = np.broadcast_to(rnd.dri_act[rnd.dri_inv], dri_exp[:, rnd.dri_inv].shape)
+    return dri_rtg[:, rnd.dri_rows], con_rtg[:, rnd.con_rows], dri_exp[:, rnd.dri_inv], actual
+
+
+def score_round(
+    model: RatingBackend, rnd: RoundData, state: dict, pair_weights: np.ndarray = None,
+    diagnostics: PredictionDiagnostics = None, year: int = None
+) -> tuple:
+    '''Returns the combined ratings of a round's rows, the expected score of
+    every pair, and each candidate's log likelihood and number of predicted
+    pairs of the round, before its updates. Pairs are weighted per candidate
+    by pair_weights if given. If diagnostics is given, adds the first
+    candidate's rated pairs to it under the era of year.'''
+
+    elo, exp_mat = model.get_round_expected(rnd, state)
+
+    # track log likelihood of each pair once, from the winner's expected score
+    won_ll = np.log(np.maximum(exp_mat[:, rnd.won], 1E-10))
+    if pair_weights is None:
+        log_likelihood, n_pred = won_ll.sum(axis=1), rnd.won.sum()
+    else:
+        won_weights = pair_weights[:, rnd.won]
+        log_likelihood, n_pred = (won_ll * won_weights).sum(axis=1), won_weights.sum(axis=1)
+
+    if diagnostics is not None:
+        rated = np.triu(rnd.won | rnd.won.T, k=1)
+        diagnostics.update(exp_mat[0][rated], rnd.outcome[rated], int(year // 10 * 10))
+
+    return elo, exp_mat, log_likelihood, n_pred
+
+
+def replay(
+    mod_data: ModelData, param_mat: np.ndarray, start_score: float, export: bool = False, jac: bool = False,
+    diagnostics: PredictionDiagnostics = None, bootstrap_rng: np.random.Generator = None, backend: type = customRatingSystem
+) -> np.ndarray:
+    '''Returns mean negative log likelihood of the rating backend for each
+    row of a (candidates, params) matrix, advancing the candidates' rating
+    states together round by round. If export = True, also stores every
+    candidate's modelled outputs (see ModelData.to_frame). If jac = True,
+    returns the likelihoods and their gradients with respect to the params,
+    carrying forward-mode sensitivities of every rating through the replay
+    (initial ratings are treated as constants, backends with has_jac only,
+    see replay_finite_diffs otherwise). If diagnostics is given, adds
+    the first candidate's rated pairs to it. If bootstrap_rng is given, every
+    candidate replays its own bootstrap resample of the history, with each
+    pair of each round weighted by a Poisson(1) draw, and likelihoods are
+    weighted alike (gradients are not supported).'''
+
+    if jac and bootstrap_rng is not None:
+        raise ValueError("gradients are not supported for bootstrap replays")
+
+    if jac and not backend.has_jac:
+        raise ValueError(f"analytic gradients are not supported by the {backend.name} backend")
+
+    param_mat = np.asarray(param_mat, dtype=float)
+    n_cand = param_mat.shape[0]
+    model = backend(*param_mat.T[:, :, None])
+    state = mod_data.reset(start_score, model, n_cand)
+    dri_rtg, con_rtg = state["dri_rtg"], state["con_rtg"]
+    log_likelihood = np.zeros(n_cand)
+    n_pred = 0
 
     if export:
-        RES_DF = pd.DataFrame(MOD_MAT, columns=MOD_DF.columns)
-        RES_DF.to_csv(CONFIG["data"]["modelled_path"], index=False)
-        return - log_likelihood / n_pred
+        mod_data.allocate_outputs(n_cand)
+
+    if jac:
+        dri_grads = np.zeros(dri_rtg.shape + (4,))
+        con_grads = np.zeros(con_rtg.shape + (4,))
+        ll_grad = np.zeros((n_cand, 4))
+
+    mod_data.n_replays += 1
+    mod_data.n_evals += n_cand
+    round_secs = mod_data.round_secs
+    for rnd_ix, rnd in enumerate(mod_data.rounds):
+        start_time = time.perf_counter()
+
+        # get current ratings, expected scores of every pair and their likelihood
+        pair_weights = None if bootstrap_rng is None else get_pair_weights(bootstrap_rng, n_cand, rnd.stop - rnd.start)
+        year = None if diagnostics is None else mod_data.features_df["year"].iat[rnd.start]
+        elo, exp_mat, round_ll, round_pred = score_round(model, rnd, state, pair_weights, diagnostics, year)
+        log_likelihood += round_ll
+        n_pred += round_pred
+
+        if jac:
+            # calculate score changes per row and sum per driver and constructor
+            dri_diff, con_diff = get_score_diffs(rnd, exp_mat)
+
+            # propagate rating sensitivities through expected scores (params: c, w, player lr, team lr)
+            elo_grad = dri_grads[:, rnd.dri_rows] + model.w[..., None] * con_grads[:, rnd.con_rows]
+            elo_grad[..., 1] += con_rtg[:, rnd.con_rows]
+            slope = exp_mat * (1 - exp_mat)
+            ll_weights = rnd.won * (exp_mat > 1E-10) * (1 - exp_mat)
+            ll_grad += sum_pair_grads(ll_weights, elo, elo_grad, model.c).sum(axis=1)
+
+            # rating changes move against the change in expected scores
+            dri_diff_grad = rnd.dri_group.T @ -sum_pair_grads(rnd.dri_pair * slope, elo, elo_grad, model.c)
+            con_diff_grad = rnd.con_group.T @ -sum_pair_grads(rnd.con_pair * slope, elo, elo_grad, model.c)
+
+            dri_rated = rnd.dri_n != 0
+            con_rated = rnd.con_n != 0
+            dri_ixs = rnd.dri_ixs[dri_rated]
+            con_ixs = rnd.con_ixs[con_rated]
 
-    else:   
+            dri_n = rnd.dri_n[dri_rated, None]
+            dri_grads[:, dri_ixs] += model.player_lr[..., None] * dri_diff_grad[:, dri_rated] / dri_n
+            dri_grads[:, dri_ixs, 2] += dri_diff[:, dri_rated] / dri_n[:, 0]
+
+            con_n = rnd.con_n[con_rated, None]
+            con_grads[:, con_ixs] += model.team_lr[..., None] * con_diff_grad[:, con_rated] / con_n
+            con_grads[:, con_ixs, 3] += con_diff[:, con_rated] / con_n[:, 0]
+
+            update_ratings(model, rnd, dri_diff, con_diff, dri_rtg, con_rtg)
+
+        else:
+            model.update_round(rnd, state, exp_mat, pair_weights)
+
+        if export:
+            (
+                mod_data.dri_scores[:, rnd.start:rnd.stop], mod_data.con_scores[:, rnd.start:rnd.stop],
+                mod_data.expected[:, rnd.start:rnd.stop], mod_data.actual[:, rnd.start:rnd.stop]
+            ) = get_round_outputs(rnd, exp_mat, dri_rtg, con_rtg)
+
+        round_secs[rnd_ix] += time.perf_counter() - start_time
+
+    if jac:
+        return - log_likelihood / n_pred, - ll_grad / n_pred
+
+    else:
         return - log_likelihood / n_pred
 
+
+def replay_finite_diffs(
+    mod_data: ModelData, param_mat: np.ndarray, start_score: float, backend: type = customRatingSystem, rel_step: float = 1E-6
+) -> tuple:
+    '''Returns mean negative log likelihood of the rating backend for each
+    row of a (candidates, params) matrix and its forward-difference gradient
+    with respect to the params, replaying every candidate with each param
+    stepped in turn as one batch of candidates'''
+
+    param_mat = np.asarray(param_mat, dtype=float)
+    n_cand, n_params = param_mat.shape
+    steps = rel_step * np.maximum(np.abs(param_mat), 1)
+    stepped = param_mat[:, None, :] + np.eye(n_params) * steps[:, None, :]
+    losses = replay(mod_data, np.concatenate([param_mat[:, None, :], stepped], axis=1).reshape(-1, n_params), start_score, backend=backend)
+    losses = losses.reshape(n_cand, n_params + 1)
+    return losses[:, 0], (losses[:, 1:] - losses[:, :1]) / steps
+
+
+class RatingStream():
+    '''Rating state advanced one round of features at a time. Holds only the
+    state of drivers and constructor-years seen so far, growing it as new
+    ones appear, so memory is bounded by the number of entities and the
+    grid size rather than the length of the history. Rounds are rated by
+    the backend through the same round steps as replay.'''
+
+    def __init__(
+        self, params: np.ndarray, start_score: float, init_state: dict = None, diagnostics: PredictionDiagnostics = None,
+        backend: type = customRatingSystem
+    ):
+        '''init_state optionally holds state arrays to start from instead of
+        the backend's starting state, keyed as in a model checkpoint'''
+
+        self.model = backend(*np.asarray(params, dtype=float)[None, :].T[:, :, None])
+        self.start_score = start_score
+        self.diagnostics = diagnostics
+        self.index = {"dri": {}, "con": {}}
+        self.state = self.get_start_state(64)
+        self.log_likelihood = 0.0
+        self.n_pred = 0
+
+        if init_state is not None:
+            for kind in ["dri", "con"]:
+                rows = self.get_rows(init_state[f"{kind}_ids"], kind)
+                for name in self.get_state_names(kind):
+                    if name in init_state:
+                        self.state[name][0, rows] = init_state[name]
+
+    @property
+    def loss(self) -> float:
+        '''Returns mean negative log likelihood of the rounds so far'''
+        return - self.log_likelihood / self.n_pred
+
+    def get_state_names(self, kind: str) -> list:
+        '''Returns the backend's state array names of drivers ("dri") or
+        constructor-years ("con")'''
+        return [name for name in self.model.state_names if name.startswith(f"{kind}_")]
+
+    def get_start_state(self, n_slots: int) -> dict:
+        '''Returns state arrays of n_slots entities at the backend's starting state'''
+
+        state = {name: np.empty((1, n_slots)) for name in self.model.state_names}
+        self.model.reset_state(state, self.start_score)
+        return state
+
+    def get_rows(self, ids: np.ndarray, kind: str) -> np.ndarray:
+        '''Returns state indices of driver ("dri") or constructor-year ("con")
+        ids, adding ids not seen before at the starting state'''
+
+        index = self.index[kind]
+        rows = np.array([index.setdefault(entity_id, len(index)) for entity_id in ids.tolist()], dtype=np.int32)
+
+        # grow state arrays geometrically, with new slots at the starting state
+        n_slots = self.state[f"{kind}_rtg"].shape[1]
+        if len(index) > n_slots:
+            grown = self.get_start_state(max(2 * n_slots, len(index)))
+            for name in self.get_state_names(kind):
+                grown[name][:, :n_slots] = self.state[name]
+                self.state[name] = grown[name]
+
+        return rows
+
+    def update(self, rounds_df: pd.DataFrame) -> pd.DataFrame:
+        '''Applies whole rounds of features to the state in order and returns
+        them with their modelled output columns (see ModelData.to_frame)'''
+
+        dri_rows = self.get_rows(rounds_df["driverId"].to_numpy(), "dri")
+        con_rows = self.get_rows(rounds_df["constructorYearId"].to_numpy(), "con")
+        positions = rounds_df["mapPosition"].to_numpy(dtype=float)
+        statuses = get_status_codes(rounds_df["status"])
+        years = rounds_df["year"].to_numpy()
+        round_keys = years.astype(np.int64) * 1000 + rounds_df["round"].to_numpy()
+        starts = np.flatnonzero(np.diff(round_keys, prepend=-1))
+        outputs = np.empty((4, rounds_df.shape[0]))
+
+        for start, stop in zip(starts, np.append(starts[1:], rounds_df.shape[0])):
+            rnd = get_round_data(dri_rows[start:stop], con_rows[start:stop], positions[start:stop], statuses[start:stop], start)
+
+            _, exp_mat, round_ll, round_pred = score_round(self.model, rnd, self.state, diagnostics=self.diagnostics, year=years[start])
+            self.log_likelihood += float(round_ll[0])
+            self.n_pred += int(round_pred)
+
+            self.model.update_round(rnd, self.state, exp_mat)
+            outputs[:, start:stop] = np.concatenate(get_round_outputs(rnd, exp_mat, self.state["dri_rtg"], self.state["con_rtg"]))
+
+        return rounds_df.assign(driverScore=outputs[0], constructorScore=outputs[1], expected=outputs[2], actual=outputs[3])
+
+    def get_state(self) -> dict:
+        '''Returns the current state arrays keyed as in a model checkpoint'''
+
+        state = {}
+        for kind in ["dri", "con"]:
+            ids = np.fromiter(self.index[kind], dtype=np.int64, count=len(self.index[kind]))
+            order = np.argsort(ids)
+            state[f"{kind}_ids"] = ids[order]
+            for name in self.get_state_names(kind):
+                state[name] = self.state[name][0, :ids.shape[0]][order]
+
+        return state
+
+
+def get_features_hash(features_df: pd.DataFrame) -> str:
+    '''Returns a content hash of the modelled columns of the features'''
+
+    hash_cols = ["year", "round", "constructorYearId", "driverId", "mapPosition", "status"]
+    row_hashes = pd.util.hash_pandas_object(features_df[hash_cols], index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+class RatingModel():
+    '''Rating model context holding a config and its model data, loading
+    the features on first use. Pickles without its loaded data so it can be
+    handed to worker processes cheaply.'''
+
+    def __init__(self, config: dict = None, mod_data: ModelData = None):
+        self.config = config or CONFIG
+        self._data = mod_data
+        self.cache_hits = 0
+        self.fit_stats = {}
+
+    def __getstate__(self) -> dict:
+        return {"config": self.config, "_data": None, "cache_hits": 0, "fit_stats": {}}
+
+    @property
+    def data(self) -> ModelData:
+        '''Returns the model data, loading features on first use'''
+
+        if self._data is None:
+            self._data = ModelData(storage.read_dataset("features_path", config=self.config))
+
+        return self._data
+
+    @property
+    def backend(self) -> type:
+        '''Returns the configured rating backend class'''
+        return get_backend(self.config)
+
+    def model_data_batch(
+        self, param_mat: np.ndarray, export: bool = False, jac: bool = False, diagnostics: PredictionDiagnostics = None
+    ) -> np.ndarray:
+        '''Returns mean negative log likelihood of the rating backend for each
+        row of a (candidates, params) matrix in one batched replay (see replay),
+        with forward-difference gradients for backends without analytic ones'''
+
+        start_score = self.config["model"]["start_score"]
+        if jac and not self.backend.has_jac:
+            result = replay_finite_diffs(self.data, param_mat, start_score, backend=self.backend)
+            if export or diagnostics is not None:
+                replay(self.data, param_mat, start_score, export=export, diagnostics=diagnostics, backend=self.backend)
+            return result
+
+        return replay(self.data, param_mat, start_score, export=export, jac=jac, diagnostics=diagnostics, backend=self.backend)
+
+    def get_cache_key(self, params: np.ndarray) -> str:
+        '''Returns the cache key of model_data results for params rounded to the
+        cache precision, the rating backend, the model inputs and the model
+        code version'''
+
+        with open(__file__, "rb") as code_file:
+            code_hash = hashlib.sha256(code_file.read()).hexdigest()
+
+        rounded_params = np.round(np.asarray(params, dtype=float), self.config["model"]["cache"]["precision"])
+        return ResultCache.get_key(rounded_params.tolist(), self.backend.name, self.config["model"]["start_score"], self.data.get_hash(), code_hash)
+
+    def model_data(self, params: dict, export: bool = False, jac: bool = False, diagnostics: PredictionDiagnostics = None) -> float:
+        '''Returns mean negative log likelihood of the rating backend. If
+        export = True, also exports results for data reporting. If jac = True,
+        returns the likelihood and its gradient with respect to the params.
+        If diagnostics is given, replays to add every rated pair to it.
+        Results are memoised on disk if the model cache is enabled.'''
+
+        mod_data = self.data
+        cache_config = self.config["model"]["cache"]
+        cache = ResultCache(self.config["data"]["cache_dir"], cache_config["max_size_mb"])
+        cache_key = self.get_cache_key(params) if cache_config["enabled"] else None
+        entry = cache.get(cache_key) if cache_key else None
+
+        if entry is None or (jac and "grad" not in entry) or (export and "dri_scores" not in entry) or diagnostics is not None:
+            result = self.model_data_batch(np.asarray(params, dtype=float)[None, :], export=export, jac=jac, diagnostics=diagnostics)
+            entry = entry or {}
+
+            if jac:
+                entry["loss"], entry["grad"] = result[0][0], result[1][0]
+            else:
+                entry["loss"] = result[0]
+
+            if export:
+                entry.update(
+                    con_scores=mod_data.con_scores[0], dri_scores=mod_data.dri_scores[0],
+                    expected=mod_data.expected[0], actual=mod_data.actual[0]
+                )
+
+            if cache_key:
+                cache.put(cache_key, **entry)
+
+        else:
+            self.cache_hits += 1
+
+            if export:
+                # restore cached outputs
+                mod_data.allocate_outputs(1)
+                mod_data.con_scores[0] = entry["con_scores"]
+                mod_data.dri_scores[0] = entry["dri_scores"]
+                mod_data.expected[0] = entry["expected"]
+                mod_data.actual[0] = entry["actual"]
+
+        if export:
+            storage.write_dataset(mod_data.to_frame(), "modelled_path", config=self.config)
+
+        if jac:
+            return entry["loss"][()], entry["grad"]
+
+        else:
+            return entry["loss"][()]
+
+    def load_checkpoint(self) -> dict | None:
+        '''Returns the last saved model checkpoint, or None if there is none'''
+
+        try:
+            with np.load(self.config["data"]["checkpoint_path"]) as checkpoint:
+                return dict(checkpoint)
+        except FileNotFoundError:
+            return None
+
+    def save_checkpoint(self, modelled_df: pd.DataFrame, params: np.ndarray, hist_hash: str, checkpoint: dict = None) -> None:
+        '''Saves the final driver and constructor ratings of the modelled data,
+        the last round modelled and the backend, params and features hash used. Ratings
+        of entities not in the modelled data are kept from a previous checkpoint.'''
+
+        dri_ser = modelled_df.groupby("driverId")["driverScore"].last()
+        con_ser = modelled_df.groupby("constructorYearId")["constructorScore"].last()
+
+        if checkpoint is not None:
+            dri_ser = dri_ser.combine_first(pd.Series(checkpoint["dri_rtg"], index=checkpoint["dri_ids"]))
+            con_ser = con_ser.combine_first(pd.Series(checkpoint["con_rtg"], index=checkpoint["con_ids"]))
+
+        np.savez(
+            self.config["data"]["checkpoint_path"],
+            dri_ids=dri_ser.index.to_numpy(), dri_rtg=dri_ser.to_numpy(),
+            con_ids=con_ser.index.to_numpy(), con_rtg=con_ser.to_numpy(),
+            last_round=modelled_df[["year", "round"]].iloc[-1].to_numpy(),
+            backend=self.backend.name,
+            params=np.asarray(params, dtype=float),
+            start_score=self.config["model"]["start_score"],
+            hist_hash=hist_hash
+        )
+
+    def fit_params(self) -> np.ndarray:
+        '''Returns params minimising the mean negative log likelihood'''
+
+        backend = self.backend
+        result = optimize.minimize(
+            self.model_data, backend.default_params, args=(False, True), method="L-BFGS-B", jac=True,
+            bounds=backend.param_bounds, options={"disp": True}
+        )
+        self.fit_stats = {"method": "L-BFGS-B", "iterations": result.nit, "evaluations": result.nfev}
+        return result.x
+
+    def get_stats(self) -> dict:
+        '''Returns optimizer, cache and replay counters of the model, without
+        loading its data'''
+
+        stats = {"optimizer": self.fit_stats, "cache_hits": self.cache_hits}
+        if self._data is not None:
+            stats["replay"] = self._data.get_stats()
+
+        return stats
+
+    def log_results(self, params: np.ndarray) -> None:
+        '''Logs metrics, prediction diagnostics and params of fitted model,
+        exports results for data reporting, saves a checkpoint for incremental
+        updates and adds model counters to the profiling report'''
+
+        diagnostics = PredictionDiagnostics()
+        metrics_log = {
+            "log_likelihood": float(self.model_data(params, export=True, diagnostics=diagnostics)) # exports results for data reporting also
+        } | diagnostics.get_metrics()
+        with open(self.config["data"]["metrics_path"], "w") as out:  
+            json.dump(metrics_log, out)
+
+        params_log = {name: float(value) for name, value in zip(self.backend.param_names, params)}
+        with open(self.config["data"]["params_path"], "w") as out:
+            yaml.dump(params_log, out)
+
+        self.save_checkpoint(self.data.to_frame(), params, get_features_hash(self.data.features_df))
+        profiling.update_profile(self.config["data"]["profile_path"], model=self.get_stats())
+
+    def load_params(self) -> np.ndarray:
+        '''Returns the fitted params'''
+
+        with open(self.config["data"]["params_path"]) as params_file:
+            params_dict = yaml.safe_load(params_file)
+
+        return np.array([params_dict[name] for name in self.backend.param_names])
+
+    def stream_data(self, params: np.ndarray = None, diagnostics: PredictionDiagnostics = None) -> float:
+        '''Rates the features round by round, reading and writing the modelled
+        data in batches of rounds so only the rating state and the current
+        batch are held in memory. Uses the fitted params unless params are given.
+        Returns the mean negative log likelihood.'''
+
+        params = self.load_params() if params is None else params
+        stream = RatingStream(params, self.config["model"]["start_score"], diagnostics=diagnostics, backend=self.backend)
+        batches = storage.iter_rounds("features_path", columns=list(storage.FEATURES_SCHEMA), config=self.config)
+        storage.write_stream(map(stream.update, batches), "modelled_path", config=self.config)
+        return stream.loss
+
+    def update_data(self) -> None:
+        '''Applies rounds added to the features since the last checkpoint with
+        the fitted params and appends them to the modelled data. Replays all
+        rounds if there is no checkpoint, the backend keeps state other than
+        ratings, or the backend, params, start score or historical features
+        have changed.'''
+
+        params = self.load_params()
+        features_df = storage.read_dataset("features_path", config=self.config)
+        checkpoint = self.load_checkpoint()
+
+        if checkpoint is not None:
+            last_year, last_round = checkpoint["last_round"]
+            is_new = (features_df["year"] > last_year) | ((features_df["year"] == last_year) & (features_df["round"] > last_round))
+            hist_unchanged = (
+                # checkpoints hold ratings only
+                self.backend.state_names == RatingBackend.state_names
+                and str(checkpoint.get("backend", customRatingSystem.name)) == self.backend.name
+                and np.array_equal(checkpoint["params"], params)
+                and checkpoint["start_score"] == self.config["model"]["start_score"]
+                and str(checkpoint["hist_hash"]) == get_features_hash(features_df[~is_new])
+            )
+
+        # full replay
+        if checkpoint is None or not hist_unchanged:
+            self._data = ModelData(features_df)
+            self.model_data(params, export=True)
+            self.save_checkpoint(self.data.to_frame(), params, get_features_hash(features_df))
+
+        # replay new rounds only, starting from checkpoint ratings
+        elif is_new.any():
+            new_data = ModelData(features_df[is_new].reset_index(drop=True), init_state=checkpoint)
+            replay(new_data, params[None, :], self.config["model"]["start_score"], export=True, backend=self.backend)
+            new_df = new_data.to_frame()
+            storage.write_dataset(new_df, "modelled_path", append=True, config=self.config)
+            self.save_checkpoint(new_df, params, get_features_hash(features_df), checkpoint)
+
+
+MODEL = None
+
+
+def get_model() -> RatingModel:
+    '''Returns the process's default rating model'''
+
+    global MODEL
+    if MODEL is None:
+        MODEL = RatingModel()
+
+    return MODEL
+
+
+def set_model(model: RatingModel) -> None:
+    '''Sets the process's default rating model, e.g. in worker processes'''
+
+    global MODEL
+    MODEL = model
+
+
+def model_data(params: dict, export: bool = False, jac: bool = False) -> float:
+    '''Returns mean negative log likelihood of the default rating model
+    (see RatingModel.model_data)'''
+    return get_model().model_data(params, export=export, jac=jac)
+
+
+def model_data_batch(param_mat: np.ndarray, export: bool = False, jac: bool = False) -> np.ndarray:
+    '''Returns mean negative log likelihood of the default rating model for
+    each row of a (candidates, params) matrix (see replay)'''
+    return get_model().model_data_batch(param_mat, export=export, jac=jac)
+
+
 if __name__=="__main__":
-    params = [
-        400, # C-factor - sensitivity of expected outcome
-        0.5, # Driver-constructor weight
-        32,  # player learning rate
-        32   # team learning rate
-    ]
-    result = optimize.minimize(model_data, params, method="L-BFGS-B", options={"disp": True})
-    print(result.x)
-
-    #log metrics and params and export results
-    metrics_log = {
-        "log_likelihood": model_data(result.x, export=True) # exports results for data reporting also
-    } 
-    with open(CONFIG["data"]["metrics_path"], "w") as out:  
-        json.dump(metrics_log, out)
-
-    params_log = {
-        "c": float(result.x[0]),
-        "w": float(result.x[1]),
-        "player_learning_rate": float(result.x[2]),
-        "team_learning_rate": float(result.x[3])
-    }
-    with open(CONFIG["data"]["params_path"], "w") as out:
-        yaml.dump(params_log, out)
+    rating_model = get_model()
+    params = rating_model.fit_params()
+    print(params)
+
+    # log metrics and params and export results
+    rating_model.log_results(params)
@@ -0,0 +1,53 @@
+import altair as at
+import streamlit as st
+
+from f1_rating_system.app_data import get_app_data
+
+
+# page config
+st.set_page_config(page_title="F1 rating system | Championship odds", layout="wide")
+
+
+# streamlit page
+app_data = get_app_data()
+sim_df = app_data.get_optional_table("season_sim_path")
+if sim_df is None:
+    st.info(f"Results as of: {app_data.last_race}. Championship odds have not been simulated yet; run `make data_simulate`.")
+    st.stop()
+
+st.info(f"Results as of: {app_data.last_race}. Odds from {sim_df.loc[0, 'remainingRounds']} remaining rounds simulated from current ratings.")
+
+kind = st.radio("Championship", ["driver", "constructor"], format_func=lambda kind: f"{kind.title()}s'", horizontal=True)
+kind_df = sim_df[sim_df["kind"] == kind]
+title_df = kind_df[kind_df["position"] == 1].sort_values(["probability", "expectedPoints"], ascending=False).reset_index(drop=True)
+st.markdown(f"# {title_df.loc[0, 'name']} is the favourite for the {sim_df.loc[0, 'year']} {kind}s' title")
+
+# plot title odds of the contenders
+contenders_df = title_df[title_df["probability"] > 0]
+chart = at.Chart(contenders_df).encode(
+    y=at.Y("name", sort=None, title=kind.title()),
+    x=at.X("probability:Q", title="Title odds", axis=at.Axis(format="%")),
+    tooltip=[
+        at.Tooltip("name", title=kind.title()),
+        at.Tooltip("probability:Q", format=".1%", title="Title odds"),
+        at.Tooltip("points:Q", format=".0f", title="Points"),
+        at.Tooltip("expectedPoints:Q", format=".0f", title="Expected points")
+    ]
+).mark_bar(size=30).encode(
+    color=at.Color("hex_code:N", scale=None)
+).properties(height=max(60 * contenders_df.shape[0], 120))
+st.altair_chart(chart, use_container_width=True)
+
+# plot probability of each final championship position
+order = kind_df.drop_duplicates("name").sort_values("expectedPoints", ascending=False)["name"].to_list()
+heatmap = at.Chart(kind_df[kind_df["probability"] > 0]).mark_rect().encode(
+    x=at.X("position:O", title="Final position"),
+    y=at.Y("name", sort=order, title=kind.title()),
+    color=at.Color("probability:Q", title="Probability", scale=at.Scale(scheme="blues")),
+    tooltip=[
+        at.Tooltip("name", title=kind.title()),
+        at.Tooltip("position:O", title="Final position"),
+        at.Tooltip("probability:Q", format=".1%", title="Probability")
+    ]
+).properties(height=25 * len(order))
+st.altair_chart(heatmap, use_container_width=True)
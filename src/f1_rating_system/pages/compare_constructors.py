@@ -1,49 +1,41 @@
-import json
-import yaml
-
 import altair as at
-import pandas as pd
 import streamlit as st
 
+from f1_rating_system.app_data import CONFIG, get_app_data, get_series_points, show_missing_bounds
+
 
 # page config
 st.set_page_config(page_title="F1 rating system | Compare constructors", layout="wide")
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
-
-
-# helper functions
-@st.cache_data
-def load_data() -> tuple:
-    '''Load and cache data for plots on page'''
-
-    hist_df = pd.read_csv(CONFIG["data"]["hist_path"])
-    con_hist_df = hist_df[["date", "constructorId", "constructorName", "constructorScore"]].drop_duplicates()
-
-    with open(CONFIG["data"]["last_race_path"], "r") as infile:
-        last_race_dict = json.load(infile)
-
-    return con_hist_df, last_race_dict
 
 
 # steamlit page
-con_hist_df, last_race_dict = load_data()
-st.info(f"Results as of: {last_race_dict['last_race']}.")
+app_data = get_app_data()
+st.info(f"Results as of: {app_data.last_race}.")
 
 # create dataframe for comparing constructors
-selected_constructors = st.multiselect(label="Select constructors to compare.", options=sorted(list(set(con_hist_df["constructorName"]))), default=["Red Bull", "McLaren"])
-sd_sub_df = con_hist_df[con_hist_df["constructorName"].isin(selected_constructors)]
+selected_constructors = st.multiselect(label="Select constructors to compare.", options=app_data.constructor_names, default=["Red Bull", "McLaren"])
+full_resolution = st.toggle("Show every race", value=False, help="Plot every race instead of a downsampled series that keeps peaks and troughs.")
+sd_sub_df = app_data.get_constructor_history(selected_constructors, get_series_points(CONFIG, len(selected_constructors), full_resolution))
 
-# plot comparison over career timeline
-line_chart = at.Chart(sd_sub_df).mark_line().encode(
+# plot comparison over career timeline, with bootstrap bands
+chart = at.Chart(sd_sub_df).encode(
     x=at.X("date", stack=None, title="Date"),
+    color=at.Text("constructorName", title="Constructor")
+)
+bands = chart.mark_area(opacity=0.2).encode(
+    y="constructorScoreLower:Q",
+    y2="constructorScoreUpper:Q"
+)
+line_chart = chart.mark_line().encode(
     y=at.Y("constructorScore", sort=None, title="Rating", scale=at.Scale(zero=False)),
-    color=at.Text("constructorName", title="Constructor"),
     tooltip=[
         at.Tooltip("constructorName", title="Constructor"),
         at.Tooltip("constructorScore:Q", format=".0f", title="Rating"),
+        at.Tooltip("constructorScoreLower:Q", format=".0f", title="Lower bound"),
+        at.Tooltip("constructorScoreUpper:Q", format=".0f", title="Upper bound"),
         at.Tooltip("date", title="Date")
     ]
 )
 
-st.altair_chart(line_chart, use_container_width=True)
+st.altair_chart(bands + line_chart, use_container_width=True)
+show_missing_bounds(sd_sub_df, "constructorScoreLower")
@@ -1,47 +1,40 @@
-import json
-import yaml
-
 import altair as at
-import pandas as pd
 import streamlit as st
 
+from f1_rating_system.app_data import CONFIG, get_app_data, get_series_points, show_missing_bounds
+
 
 # page config
 st.set_page_config(page_title="F1 rating system | Compare drivers", layout="wide")
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
-
-
-# helper functions
-@st.cache_data
-def load_data() -> tuple:
-    '''Load and cache data for plots on page'''
-
-    dri_hist_df = pd.read_csv(CONFIG["data"]["hist_path"])
-
-    with open(CONFIG["data"]["last_race_path"], "r") as infile:
-        last_race_dict = json.load(infile)
-
-    return dri_hist_df, last_race_dict
 
 
 # streamlit app
-dri_hist_df, last_race_dict = load_data()
-st.info(f"Results as of: {last_race_dict['last_race']}.")
+app_data = get_app_data()
+st.info(f"Results as of: {app_data.last_race}.")
 
 # create dataframe for comparing drivers based on user selection
-selected_drivers = st.multiselect(label="Select drivers to compare.", options=sorted(list(set(dri_hist_df["driverName"]))), default=["Max Verstappen", "Lando Norris"])
-sd_sub_df = dri_hist_df[dri_hist_df["driverName"].isin(selected_drivers)]
+selected_drivers = st.multiselect(label="Select drivers to compare.", options=app_data.driver_names, default=["Max Verstappen", "Lando Norris"])
+full_resolution = st.toggle("Show every race", value=False, help="Plot every race instead of a downsampled series that keeps peaks and troughs.")
+sd_sub_df = app_data.get_driver_history(selected_drivers, get_series_points(CONFIG, len(selected_drivers), full_resolution))
 
-# plot comparison over career timeline
-line_chart = at.Chart(sd_sub_df).mark_line().encode(
+# plot comparison over career timeline, with bootstrap bands
+chart = at.Chart(sd_sub_df).encode(
     x=at.X("date", stack=None, title="Date"),
+    color=at.Text("driverName", title="Driver")
+)
+bands = chart.mark_area(opacity=0.2).encode(
+    y="driverScoreLower:Q",
+    y2="driverScoreUpper:Q"
+)
+line_chart = chart.mark_line().encode(
     y=at.Y("driverScore", sort=None, title="Rating", scale=at.Scale(zero=False)),
-    color=at.Text("driverName", title="Driver"),
     tooltip=[
         at.Tooltip("driverName", title="Driver"),
-        at.Tooltip("driverScore:Q", format=".0f", title="Rating")
+        at.Tooltip("driverScore:Q", format=".0f", title="Rating"),
+        at.Tooltip("driverScoreLower:Q", format=".0f", title="Lower bound"),
+        at.Tooltip("driverScoreUpper:Q", format=".0f", title="Upper bound")
     ]
 )
 
-st.altair_chart(line_chart, use_container_width=True)
+st.altair_chart(bands + line_chart, use_container_width=True)
+show_missing_bounds(sd_sub_df, "driverScoreLower")
@@ -0,0 +1,59 @@
+import streamlit as st
+
+from f1_rating_system.app_data import get_app_data
+
+
+# page config
+st.set_page_config(page_title="F1 rating system | Head to head", layout="wide")
+
+
+# streamlit page
+app_data = get_app_data()
+st.info(f"Results as of: {app_data.last_race}.")
+
+mode = st.radio("Compare", ["Current grid", "At their peaks"], horizontal=True)
+if mode == "Current grid":
+    driver_ids = app_data.h2h["grid_ids"].tolist()
+    constructors = dict(zip(driver_ids, app_data.h2h["grid_constructors"].tolist()))
+    format_driver = lambda driver_id: f"{app_data.h2h_names[driver_id]} ({constructors[driver_id]})"
+else:
+    driver_ids = app_data.h2h["driver_ids"].tolist()
+    format_driver = app_data.h2h_names.get
+
+# select drivers by id, as names are not unique
+col_a, col_b = st.columns(2)
+driver_a = col_a.selectbox("Driver A", driver_ids, index=0, format_func=format_driver)
+driver_b = col_b.selectbox("Driver B", driver_ids, index=min(1, len(driver_ids) - 1), format_func=format_driver)
+name_a, name_b = app_data.h2h_names[driver_a], app_data.h2h_names[driver_b]
+
+# look up precomputed win probabilities
+if mode == "Current grid":
+    grid_prob = app_data.get_win_prob(driver_a, driver_b)
+    st.markdown(f"# {name_a} beats {name_b} {grid_prob:.0%} of the time")
+    col_a, col_b = st.columns(2)
+    col_a.metric("In their current cars", f"{grid_prob:.1%}")
+    col_b.metric("In the same car", f"{app_data.get_win_prob(driver_a, driver_b, 'same_car_win_prob'):.1%}")
+else:
+    peak_prob = app_data.get_win_prob(driver_a, driver_b, "peak_win_prob")
+    st.markdown(f"# At their peaks, {name_a} beats {name_b} {peak_prob:.0%} of the time in the same car")
+
+# show their record as teammates
+record_df = app_data.get_teammate_record(driver_a, driver_b)
+if record_df.empty:
+    st.markdown(f"{name_a} and {name_b} were never teammates.")
+else:
+    st.markdown(f"### As teammates, {name_a} finished ahead of {name_b} in {record_df['wins'].sum()} of {record_df['races'].sum()} races")
+    st.dataframe(
+        record_df[["year", "constructorName", "races", "wins", "losses", "meanGap", "finalGap"]],
+        column_config={
+            "year": st.column_config.NumberColumn("Season", format="%d"),
+            "constructorName": "Constructor",
+            "races": "Races",
+            "wins": f"{name_a} ahead",
+            "losses": f"{name_b} ahead",
+            "meanGap": st.column_config.NumberColumn("Mean rating gap", format="%.0f"),
+            "finalGap": st.column_config.NumberColumn("Final rating gap", format="%.0f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
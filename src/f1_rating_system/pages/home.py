@@ -25,4 +25,6 @@ st.markdown("""
       [constructors](current-constructors-ratings) in 2024 and who's improved the most
     - How your favourite [drivers](/compare-driver-ratings) and 
       [constructors](/compare-constructor-ratings) compare to each other over the past 70+ years
+    - [Head to head](/head-to-head) win chances of any two drivers, and their record as teammates
+    - [Championship odds](/championship-odds) for the rest of the season, simulated from current ratings
 """)
@@ -0,0 +1,138 @@
+import argparse
+import collections
+import hashlib
+import json
+import os
+import time
+
+from f1_rating_system import bootstrap, cache, charts, config, data, diagnostics, downsample, features, head_to_head, model, profiling, rating_store, report, simulate, storage
+
+
+CONFIG = config.get_config()
+
+# pipeline stage, with inputs and outputs as data config keys, params as
+# config sections and code as modules the stage runs
+Stage = collections.namedtuple("Stage", ["name", "run", "inputs", "params", "code", "outputs"])
+
+
+def fit_model() -> None:
+    '''Fits model params and exports results for data reporting'''
+    rating_model = model.get_model()
+    rating_model.log_results(rating_model.fit_params())
+
+
+STAGES = [
+    Stage(
+        name="preprocess",
+        run=data.preprocess_data,
+        inputs=["results_csv", "races_csv", "constructor_year_csv"],
+        params=[],
+        code=[data, config, storage],
+        outputs=["preprocessed_path"]
+    ),
+    Stage(
+        name="features",
+        run=features.create_features,
+        inputs=["preprocessed_path", "status_csv"],
+        params=[],
+        code=[features, config, storage],
+        outputs=["features_path"]
+    ),
+    Stage(
+        name="model",
+        run=fit_model,
+        inputs=["features_path"],
+        params=["model"],
+        code=[model, cache, config, diagnostics, profiling, storage],
+        outputs=["modelled_path", "metrics_path", "params_path", "checkpoint_path"]
+    ),
+    Stage(
+        name="bootstrap",
+        run=bootstrap.bootstrap_ratings,
+        inputs=["modelled_path", "params_path"],
+        params=["bootstrap"],
+        code=[bootstrap, model, config, storage],
+        outputs=["bootstrap_path", "career_bounds_path"]
+    ),
+    Stage(
+        name="report",
+        run=report.make_report_data,
+        inputs=["modelled_path", "bootstrap_path", "career_bounds_path", "params_path", "colour_csv", "drivers_csv", "constructors_csv", "races_csv"],
+        params=["app", "model"],
+        code=[report, charts, config, downsample, head_to_head, model, rating_store, storage],
+        outputs=[
+            "hist_path", "rating_db_path", "last_race_path", "avg_goat_path", "avg_hist_path",
+            "cur_dri_path", "dri_imp_path", "cur_con_path", "con_imp_path", "chart_spec_path",
+            "h2h_path", "teammates_path"
+        ]
+    ),
+    Stage(
+        name="simulate",
+        run=simulate.simulate_season,
+        inputs=["hist_path", "races_csv", "colour_csv", "params_path"],
+        params=["simulate"],
+        code=[simulate, config, features, model, storage],
+        outputs=["season_sim_path"]
+    )
+]
+
+
+def get_fingerprint(stage: Stage) -> str:
+    '''Returns a hash of the contents of a stage's input files, params and code'''
+
+    fingerprint = hashlib.sha256()
+    file_paths = [CONFIG["data"][key] for key in stage.inputs] + [module.__file__ for module in stage.code]
+
+    for path in file_paths:
+        with open(path, "rb") as infile:
+            fingerprint.update(hashlib.sha256(infile.read()).digest())
+
+    fingerprint.update(json.dumps([CONFIG[section] for section in stage.params], sort_keys=True).encode())
+    return fingerprint.hexdigest()
+
+
+def run_pipeline(sample_stage: str = None) -> dict:
+    '''Runs pipeline stages in dependency order, skipping stages whose inputs
+    are unchanged since their outputs were created. Records the wall time,
+    peak memory and output rows of each stage in the profiling report, with
+    a sampled profile of sample_stage if given. Returns the stage records.'''
+
+    state_path = CONFIG["data"]["pipeline_state_path"]
+    if os.path.exists(state_path):
+        with open(state_path) as infile:
+            state = json.load(infile)
+    else:
+        state = {}
+
+    stage_stats = {}
+    for stage in STAGES:
+        start_time = time.perf_counter()
+        fingerprint = get_fingerprint(stage)
+        outputs_exist = all(os.path.exists(CONFIG["data"][key]) for key in stage.outputs)
+
+        if state.get(stage.name) == fingerprint and outputs_exist:
+            stats = {"status": "skipped", "wall_secs": time.perf_counter() - start_time}
+        else:
+            with profiling.profile_stage({"status": "ran"}, sample=stage.name == sample_stage) as stats:
+                stage.run()
+
+            stats["rows"] = profiling.count_rows([CONFIG["data"][key] for key in stage.outputs])
+            state[stage.name] = fingerprint
+
+            # record progress so a failed later stage does not rerun this one
+            with open(state_path, "w") as out:
+                json.dump(state, out, indent=2)
+
+        stage_stats[stage.name] = stats
+        print(f"{stage.name}: {stats['status']} in {stats['wall_secs']:.2f}s")
+
+    profiling.update_profile(CONFIG["data"]["profile_path"], stages=stage_stats)
+    return stage_stats
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Run the rating pipeline")
+    parser.add_argument("--sample-stage", choices=[stage.name for stage in STAGES], help="attach a sampled profile of this stage to the profiling report")
+    args = parser.parse_args()
+
+    run_pipeline(args.sample_stage)
@@ -0,0 +1,137 @@
+import collections
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+import pyarrow.parquet as pq
+
+
+class StackSampler():
+    '''Sampling profiler recording the call stack of a thread at a fixed
+    interval from a background thread'''
+
+    def __init__(self, interval: float = 0.005, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.n_samples = 0
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        '''Samples the profiled thread's stack until stopped'''
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})")
+                frame = frame.f_back
+
+            self.n_samples += 1
+            self.self_counts[stack[0]] += 1
+            self.total_counts.update(set(stack))
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def get_profile(self, top_n: int = 25) -> dict:
+        '''Returns the functions with the most samples in them (self) and
+        under them (total), with their share of samples'''
+
+        n_samples = max(self.n_samples, 1)
+        return {
+            "interval": self.interval,
+            "samples": self.n_samples,
+            "self": {func: count / n_samples for func, count in self.self_counts.most_common(top_n)},
+            "total": {func: count / n_samples for func, count in self.total_counts.most_common(top_n)}
+        }
+
+
+def reset_peak_rss() -> None:
+    '''Resets the process's peak resident memory to its current resident
+    memory where supported (Linux)'''
+
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def get_peak_rss_mb() -> float:
+    '''Returns the peak resident memory of the process in MB, since the last
+    reset where supported'''
+
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # lifetime peak, in bytes on macOS and kB elsewhere
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 ** 2 if sys.platform == "darwin" else peak_rss / 1024
+
+
+@contextlib.contextmanager
+def profile_stage(stats: dict, sample: bool = False, interval: float = 0.005):
+    '''Records the wall time and peak resident memory of the enclosed block
+    in stats, and a sampled profile of it if sample = True'''
+
+    sampler = StackSampler(interval) if sample else None
+    reset_peak_rss()
+    if sampler:
+        sampler.start()
+
+    start_time = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats["wall_secs"] = time.perf_counter() - start_time
+        stats["peak_rss_mb"] = get_peak_rss_mb()
+
+        if sampler:
+            sampler.stop()
+            stats["sampled_profile"] = sampler.get_profile()
+
+
+def count_rows(paths: list) -> int | None:
+    '''Returns the total rows of the Parquet files among paths from their
+    metadata, or None if there are none'''
+
+    parquet_paths = [path for path in paths if path.endswith(".parquet")]
+    if not parquet_paths:
+        return None
+
+    return sum(pq.ParquetFile(path).metadata.num_rows for path in parquet_paths)
+
+
+def update_profile(profile_path: str, **sections) -> None:
+    '''Updates sections of the profiling report at profile_path, keeping
+    sections written by other runs'''
+
+    try:
+        with open(profile_path) as infile:
+            profile = json.load(infile)
+    except FileNotFoundError:
+        profile = {}
+
+    profile.update(sections)
+    with open(profile_path, "w") as out:
+        json.dump(profile, out, indent=2)
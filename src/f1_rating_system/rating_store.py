@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import os
+import sqlite3
+
+import pandas as pd
+
+from f1_rating_system.config import get_config
+
+
+CONFIG = get_config()
+
+# tables and indexes of the rating store, with rating rows indexed by id
+# and race date (not unique, as drivers shared cars in early seasons)
+SCHEMA = """
+CREATE TABLE drivers (
+    driverId INTEGER PRIMARY KEY,
+    driverName TEXT NOT NULL
+);
+CREATE TABLE constructors (
+    constructorId INTEGER PRIMARY KEY,
+    constructorName TEXT NOT NULL,
+    hex_code TEXT
+);
+CREATE TABLE races (
+    year INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT,
+    PRIMARY KEY (year, round)
+);
+CREATE TABLE driver_ratings (
+    driverId INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    constructorId INTEGER NOT NULL,
+    driverScore REAL NOT NULL,
+    driverScoreLower REAL,
+    driverScoreUpper REAL,
+    driScoreChange REAL NOT NULL
+);
+CREATE TABLE constructor_ratings (
+    constructorId INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    round INTEGER NOT NULL,
+    constructorScore REAL NOT NULL,
+    constructorScoreLower REAL,
+    constructorScoreUpper REAL,
+    conScoreChange REAL NOT NULL
+);
+CREATE TABLE driver_standings (
+    driverId INTEGER PRIMARY KEY,
+    constructorId INTEGER NOT NULL,
+    driverScore REAL NOT NULL,
+    seasonChange REAL NOT NULL,
+    lastRound INTEGER NOT NULL
+);
+CREATE TABLE constructor_standings (
+    constructorId INTEGER PRIMARY KEY,
+    constructorScore REAL NOT NULL,
+    seasonChange REAL NOT NULL,
+    lastRound INTEGER NOT NULL
+);
+CREATE INDEX drivers_name ON drivers (driverName);
+CREATE INDEX constructors_name ON constructors (constructorName);
+CREATE INDEX driver_ratings_driver_date ON driver_ratings (driverId, date);
+CREATE INDEX constructor_ratings_constructor_date ON constructor_ratings (constructorId, date);
+CREATE INDEX driver_ratings_season ON driver_ratings (year, round);
+CREATE INDEX constructor_ratings_season ON constructor_ratings (year, round);
+"""
+
+# tables and columns queried per kind of rated entity
+KINDS = {
+    "drivers": {
+        "id_col": "driverId", "name_col": "driverName", "score_col": "driverScore",
+        "ratings": "driver_ratings", "standings": "driver_standings"
+    },
+    "constructors": {
+        "id_col": "constructorId", "name_col": "constructorName", "score_col": "constructorScore",
+        "ratings": "constructor_ratings", "standings": "constructor_standings"
+    }
+}
+
+# plotted columns of rating histories per kind, with bootstrap bounds
+HISTORY_COLUMNS = {
+    "drivers": ["date", "driverName", "driverScore", "driverScoreLower", "driverScoreUpper"],
+    "constructors": ["date", "constructorId", "constructorName", "constructorScore", "constructorScoreLower", "constructorScoreUpper"]
+}
+
+
+def make_standings(season_df: pd.DataFrame, id_col: str, score_col: str, change_col: str, extra_cols: list = None) -> pd.DataFrame:
+    '''Returns the latest rating, summed rating change and whether they
+    raced the last round of each entity in a season's rating rows'''
+
+    season_df = season_df.sort_values("date")
+    standings_df = season_df.groupby(id_col).agg(
+        **{col: (col, "last") for col in (extra_cols or []) + [score_col]},
+        seasonChange=(change_col, "sum"),
+        lastDate=("date", "last")
+    ).reset_index()
+    standings_df["lastRound"] = (standings_df.pop("lastDate") == season_df["date"].max()).astype(int)
+    return standings_df
+
+
+def write_rating_store(res_df: pd.DataFrame, races_df: pd.DataFrame, colours_df: pd.DataFrame, config: dict) -> None:
+    '''Writes drivers, constructors, races, rating rows per driver and
+    constructor per race and current season standings to the rating store,
+    replacing it whole so readers never see a partial store'''
+
+    db_path = config["data"]["rating_db_path"]
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    dri_cols = ["driverId", "date", "year", "round", "constructorId", "driverScore", "driverScoreLower", "driverScoreUpper", "driScoreChange"]
+    con_cols = ["constructorId", "date", "year", "round", "constructorScore", "constructorScoreLower", "constructorScoreUpper", "conScoreChange"]
+    dri_rtg_df = res_df[dri_cols]
+    con_rtg_df = res_df[con_cols].drop_duplicates(["constructorId", "year", "round"])
+    cur_year = res_df["year"].max()
+
+    tables = {
+        "drivers": res_df[["driverId", "driverName"]].drop_duplicates("driverId"),
+        "constructors": res_df[["constructorId", "constructorName"]].drop_duplicates("constructorId").merge(colours_df[["constructorId", "hex_code"]], on="constructorId", how="left"),
+        "races": res_df[["year", "round", "date"]].drop_duplicates().merge(races_df[["year", "round", "name"]], on=["year", "round"], how="left"),
+        "driver_ratings": dri_rtg_df,
+        "constructor_ratings": con_rtg_df,
+        "driver_standings": make_standings(dri_rtg_df[dri_rtg_df["year"] == cur_year], "driverId", "driverScore", "driScoreChange", ["constructorId"]),
+        "constructor_standings": make_standings(con_rtg_df[con_rtg_df["year"] == cur_year], "constructorId", "constructorScore", "conScoreChange")
+    }
+
+    with contextlib.closing(sqlite3.connect(tmp_path)) as conn:
+        conn.executescript(SCHEMA)
+        for table, table_df in tables.items():
+            table_df.to_sql(table, conn, if_exists="append", index=False)
+        conn.commit()
+
+    os.replace(tmp_path, db_path)
+
+
+@contextlib.contextmanager
+def connect(db_path: str):
+    '''Yields a read-only connection to the rating store'''
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def query(db_path: str, sql: str, params: list = ()) -> pd.DataFrame:
+    '''Returns the rows of a read-only query of the rating store'''
+
+    with connect(db_path) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def get_names(db_path: str, kind: str) -> list:
+    '''Returns the sorted distinct names of drivers or constructors'''
+
+    cols = KINDS[kind]
+    return query(db_path, f"SELECT DISTINCT {cols['name_col']} FROM {kind} ORDER BY {cols['name_col']}").iloc[:, 0].to_list()
+
+
+def get_history(db_path: str, kind: str, names: list) -> pd.DataFrame:
+    '''Returns the rating histories of the named drivers or constructors,
+    with the plotted columns and their ids, in date order per id'''
+
+    cols = KINDS[kind]
+    select_cols = dict.fromkeys([cols["id_col"]] + HISTORY_COLUMNS[kind])
+    placeholders = ", ".join("?" * len(names))
+    return query(db_path, f"""
+        SELECT {', '.join(select_cols)}
+        FROM {kind} JOIN {cols['ratings']} USING ({cols['id_col']})
+        WHERE {cols['name_col']} IN ({placeholders})
+        ORDER BY {cols['id_col']}, date
+    """, list(names))
+
+
+def get_season_top(db_path: str, kind: str, year: int, n: int = 10) -> pd.DataFrame:
+    '''Returns the top n drivers or constructors of a season by their
+    rating after their last race of it'''
+
+    cols = KINDS[kind]
+    return query(db_path, f"""
+        SELECT {cols['name_col']}, {cols['score_col']}
+        FROM (
+            SELECT {cols['id_col']}, {cols['score_col']},
+                ROW_NUMBER() OVER (PARTITION BY {cols['id_col']} ORDER BY date DESC) AS recency
+            FROM {cols['ratings']}
+            WHERE year = ?
+        ) JOIN {kind} USING ({cols['id_col']})
+        WHERE recency = 1
+        ORDER BY {cols['score_col']} DESC
+        LIMIT ?
+    """, [year, n])
+
+
+def get_standings(db_path: str, kind: str, order_by: str = "score", last_round: bool = True, n: int = None) -> pd.DataFrame:
+    '''Returns the current season standings of drivers or constructors,
+    ordered by rating (order_by = "score") or by rating change over the
+    season (order_by = "change"), only of those in the last round if
+    last_round = True'''
+
+    cols = KINDS[kind]
+    order_col = {"score": cols["score_col"], "change": "seasonChange"}[order_by]
+    return query(db_path, f"""
+        SELECT {cols['name_col']}, s.*
+        FROM {cols['standings']} AS s JOIN {kind} USING ({cols['id_col']})
+        WHERE lastRound >= ?
+        ORDER BY {order_col} DESC
+        LIMIT ?
+    """, [int(last_round), -1 if n is None else n])
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Query top ratings from the rating store")
+    parser.add_argument("--kind", choices=list(KINDS), default="drivers")
+    parser.add_argument("--season", type=int, help="season to rank by rating after each entity's last race, instead of current standings")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = CONFIG["data"]["rating_db_path"]
+    if args.season:
+        print(get_season_top(db_path, args.kind, args.season, args.top).to_string(index=False))
+    else:
+        print(get_standings(db_path, args.kind, n=args.top).to_string(index=False))
@@ -1,22 +1,28 @@
 import json
-import yaml
 
+import numpy as np
 import pandas as pd
 
+from f1_rating_system import charts, head_to_head, model, rating_store, storage
+from f1_rating_system.config import get_config
 
-with open("params.yaml") as conf_file:
-    CONFIG = yaml.safe_load(conf_file)
 
+CONFIG = get_config()
 
-def make_report_data() -> None:
+
+def make_report_data(config: dict = None) -> None:
     '''Creates and saves datasets to data/processed directory for use 
-    in streamlit app'''
+    in streamlit app. Uses the project config unless config is given.'''
+
+    config = config or CONFIG
 
-    mod_df = pd.read_csv(CONFIG["data"]["modelled_path"])
-    col_df = pd.read_csv(CONFIG["data"]["colour_csv"])
-    dri_df = pd.read_csv(CONFIG["data"]["drivers_csv"])
-    con_df = pd.read_csv(CONFIG["data"]["constructors_csv"])
-    raw_races_df = pd.read_csv(CONFIG["data"]["races_csv"])
+    mod_df = storage.read_dataset("modelled_path", config=config)
+    bounds_df, career_df = get_rating_bounds(mod_df, config)
+    mod_df = mod_df.join(bounds_df)
+    col_df = pd.read_csv(config["data"]["colour_csv"])
+    dri_df = pd.read_csv(config["data"]["drivers_csv"])
+    con_df = pd.read_csv(config["data"]["constructors_csv"])
+    raw_races_df = pd.read_csv(config["data"]["races_csv"])
 
     # map constructor and driver names to respective IDs
     dri_df["driverName"] = dri_df[["forename", "surname"]].apply(lambda row: " ".join(row), axis=1)
@@ -33,35 +39,36 @@ def make_report_data() -> None:
     res_con_df = res_con_df.drop(columns=["constructorScore"])
     res_df = res_df.merge(res_con_df, on=["year", "round", "constructorId"], how="left")
     res_df["conScoreChange"] = res_df["constructorScore"] - res_df["startConScore"]
-    res_df.to_csv(CONFIG["data"]["hist_path"])
+    storage.write_dataset(res_df, "hist_path", config=config)
 
     ## create dict for last race completed
     last_race_row = raw_races_df["date"] == mod_df["date"].max()
     last_race_ser = raw_races_df.loc[last_race_row, ["year", "name"]].iloc[0].tolist()
     last_race_dict = {"last_race": f"{last_race_ser[0]} {last_race_ser[1]}"}
 
-    with open(CONFIG["data"]["last_race_path"], "w") as outfile:
+    with open(config["data"]["last_race_path"], "w") as outfile:
         json.dump(last_race_dict, outfile)    
     
     # create dataset for top 10 drivers
     avg_goat_df = res_df.groupby(["driverId", "driverName"])["driverScore"].mean().reset_index()
     avg_goat_df = avg_goat_df.rename(columns={"driverScore": "meanScore"})
     avg_goat_df = avg_goat_df.sort_values("meanScore", ascending=False).head(10).reset_index(drop=True)
+    avg_goat_df = avg_goat_df.merge(career_df, on="driverId", how="left")
     avg_goat_df["hex_code"] = ["#FFD700", "#C0C0C0", "#CD7F32"] + ["#F7EAB4"] * (avg_goat_df.shape[0] - 3)
-    avg_goat_df.to_csv(CONFIG["data"]["avg_goat_path"], index=False)
+    avg_goat_df.to_csv(config["data"]["avg_goat_path"], index=False)
 
     # create dataset for top 3 drivers career plots
     avg_hist_df = res_df[res_df["driverId"].isin(avg_goat_df.loc[:2, "driverId"])]
-    avg_hist_df.to_csv(CONFIG["data"]["avg_hist_path"], index=False)
+    avg_hist_df.to_csv(config["data"]["avg_hist_path"], index=False)
 
     # create current driver rating data
     cur_yr_df = res_df[res_df["year"] == res_df["year"].max()]
     cur_yr_df = cur_yr_df.merge(col_df, how="left", on="constructorId")
 
     cur_round_row = cur_yr_df["round"] == cur_yr_df["round"].max()
-    cur_dri_df = cur_yr_df.loc[cur_round_row, ["constructorId", "driverName", "driverScore", "hex_code"]]
+    cur_dri_df = cur_yr_df.loc[cur_round_row, ["constructorId", "driverName", "driverScore", "driverScoreLower", "driverScoreUpper", "hex_code"]]
     cur_dri_df = cur_dri_df.sort_values("driverScore", ascending=False).reset_index(drop=True)
-    cur_dri_df.to_csv(CONFIG["data"]["cur_dri_path"], index=False)
+    cur_dri_df.to_csv(config["data"]["cur_dri_path"], index=False)
 
     # create driver rating improvement data
     dri_imp_df = cur_yr_df.copy()
@@ -70,19 +77,67 @@ def make_report_data() -> None:
     dri_imp_df = dri_imp_df.sort_values("cumDriScoreChange", ascending=False)
     dri_imp_df = dri_imp_df[["driverName", "cumDriScoreChange", "hex_code"]].reset_index(drop=True)
     dri_imp_df["baseline"] = 0
-    dri_imp_df.to_csv(CONFIG["data"]["dri_imp_path"], index=False)
+    dri_imp_df.to_csv(config["data"]["dri_imp_path"], index=False)
 
     # create current constructor rating data
-    cur_con_df = cur_yr_df.loc[cur_round_row, ["constructorId", "constructorName", "constructorScore", "hex_code"]]
+    cur_con_df = cur_yr_df.loc[cur_round_row, ["constructorId", "constructorName", "constructorScore", "constructorScoreLower", "constructorScoreUpper", "hex_code"]]
     cur_con_df = cur_con_df.drop_duplicates().sort_values("constructorScore", ascending=False).reset_index(drop=True)
-    cur_con_df.to_csv(CONFIG["data"]["cur_con_path"], index=False)
+    cur_con_df.to_csv(config["data"]["cur_con_path"], index=False)
 
     # create constructor rating improvement data
     con_imp_df = cur_yr_df[["constructorId", "constructorName", "conScoreChange", "hex_code"]].drop_duplicates()
     con_imp_df = con_imp_df.groupby(["constructorId", "constructorName", "hex_code"])["conScoreChange"].sum().reset_index()
     con_imp_df = con_imp_df.sort_values("conScoreChange", ascending=False).reset_index(drop=True)
     con_imp_df["baseline"] = 0
-    con_imp_df.to_csv(CONFIG["data"]["con_imp_path"], index=False)
+    con_imp_df.to_csv(config["data"]["con_imp_path"], index=False)
+
+    # precompile static app charts
+    tables = {
+        "avg_goat_path": avg_goat_df, "avg_hist_path": avg_hist_df, "cur_dri_path": cur_dri_df,
+        "dri_imp_path": dri_imp_df, "cur_con_path": cur_con_df, "con_imp_path": con_imp_df
+    }
+    charts.write_chart_specs(tables, config)
+
+    # write indexed rating store for app pages and ad-hoc queries
+    rating_store.write_rating_store(res_df, raw_races_df, col_df, config)
+
+    # precompute head-to-head win probabilities and teammate records
+    rating_system = model.get_backend(config)(*model.RatingModel(config).load_params())
+    head_to_head.write_head_to_head(res_df, rating_system, config)
+
+
+def get_rating_bounds(mod_df: pd.DataFrame, config: dict) -> tuple:
+    '''Returns bootstrap interval bounds of the modelled rows' ratings and of
+    drivers' career mean ratings. Bounds are kept for rows matching the
+    bootstrapped rows, e.g. rows before rounds added by an incremental
+    update, and are missing for other rows and for the career means of
+    drivers with other rows.'''
+
+    try:
+        boot_df = storage.read_dataset("bootstrap_path", config=config)
+        career_df = storage.read_dataset("career_bounds_path", config=config)
+    except FileNotFoundError:
+        boot_df = None
+
+    bounds_df = pd.DataFrame(np.nan, index=mod_df.index, columns=list(storage.BOUNDS_SCHEMA))
+    if boot_df is None:
+        return bounds_df, pd.DataFrame(columns=list(storage.CAREER_BOUNDS_SCHEMA)).astype(storage.CAREER_BOUNDS_SCHEMA)
+
+    # match rows by position, as updates append rounds to the modelled data
+    n_rows = min(boot_df.shape[0], mod_df.shape[0])
+    key_cols = ["year", "round", "driverId", "constructorYearId"]
+    matched = np.zeros(mod_df.shape[0], dtype=bool)
+    matched[:n_rows] = (
+        (boot_df[key_cols].to_numpy()[:n_rows] == mod_df[key_cols].to_numpy()[:n_rows]).all(axis=1)
+        & np.isclose(boot_df["driverScore"].to_numpy()[:n_rows], mod_df["driverScore"].to_numpy()[:n_rows])
+    )
+    bounds_df.loc[matched] = boot_df[list(storage.BOUNDS_SCHEMA)].to_numpy()[:n_rows][matched[:n_rows]]
+
+    unmatched_drivers = mod_df.loc[~matched, "driverId"].unique()
+    career_df = career_df.assign(**{
+        col: career_df[col].where(~career_df["driverId"].isin(unmatched_drivers)) for col in ["meanScoreLower", "meanScoreUpper"]
+    })
+    return bounds_df, career_df
 
 
 if __name__=="__main__":
@@ -0,0 +1,127 @@
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from bayes_opt import BayesianOptimization, UtilityFunction
+from scipy import optimize
+
+from f1_rating_system import model
+from f1_rating_system.config import get_config
+
+
+# global variables
+CONFIG = get_config()
+
+# feature columns shared with worker processes, statuses as model status codes
+SHARED_COLUMNS = ["year", "round", "driverId", "constructorYearId", "mapPosition", "status"]
+SHARED_MEM = None
+
+
+def share_features(mod_data: model.ModelData) -> shared_memory.SharedMemory:
+    '''Returns shared memory holding the model columns of the features as a
+    float64 matrix'''
+
+    feat_mat = mod_data.features_df[SHARED_COLUMNS[:-1]].to_numpy(dtype=float)
+    feat_mat = np.column_stack([feat_mat, mod_data.statuses])
+
+    shm = shared_memory.SharedMemory(create=True, size=feat_mat.nbytes)
+    np.ndarray(feat_mat.shape, dtype=float, buffer=shm.buf)[:] = feat_mat
+    return shm
+
+
+def attach_features(shm_name: str, shape: tuple) -> None:
+    '''Worker initialiser setting the model data from the shared features
+    matrix instead of re-reading the features file'''
+
+    global SHARED_MEM
+    SHARED_MEM = shared_memory.SharedMemory(name=shm_name)
+    feat_mat = np.ndarray(shape, dtype=float, buffer=SHARED_MEM.buf)
+    model.set_model(model.RatingModel(mod_data=model.ModelData(pd.DataFrame(feat_mat, columns=SHARED_COLUMNS, copy=False))))
+
+
+def evaluate_batch(param_mat: np.ndarray) -> np.ndarray:
+    '''Returns mean negative log likelihood of each candidate params'''
+    return model.model_data_batch(param_mat)
+
+
+def evaluate(pool: concurrent.futures.Executor, param_mat: np.ndarray, n_jobs: int) -> np.ndarray:
+    '''Returns mean negative log likelihood of each candidate params,
+    splitting candidates into one batched replay per worker'''
+
+    batches = [batch for batch in np.array_split(param_mat, n_jobs) if batch.shape[0] > 0]
+    return np.concatenate(list(pool.map(evaluate_batch, batches)))
+
+
+def register(optimizer: BayesianOptimization, param_mat: np.ndarray, losses: np.ndarray) -> None:
+    '''Registers evaluated candidates with the optimizer, which maximises
+    negative losses'''
+
+    for params, loss in zip(param_mat, losses):
+        optimizer.register(params=dict(zip(model.get_model().backend.param_names, params)), target=-loss)
+
+
+def drop_registered(optimizer: BayesianOptimization, param_mat: np.ndarray, param_names: list) -> np.ndarray:
+    '''Returns the candidates the optimizer has not registered yet, with
+    params in the order of param_names'''
+
+    key_ixs = [optimizer.space.keys.index(name) for name in param_names]
+    registered = set(map(tuple, optimizer.space.params[:, key_ixs].tolist()))
+    return param_mat[[tuple(params) not in registered for params in param_mat.tolist()]]
+
+
+def search_params() -> np.ndarray:
+    '''Returns best params found by a parallel Bayesian search over the
+    model's opt_params bounds, refined with L-BFGS-B'''
+
+    opt_params = CONFIG["model"]["opt_params"]
+    param_names = model.get_model().backend.param_names
+    pbounds = {name: tuple(opt_params["pbounds"][name]) for name in param_names}
+    bounds = np.array(list(pbounds.values()), dtype=float)
+    n_jobs = opt_params["n_jobs"] or os.cpu_count()
+    rng = np.random.RandomState(opt_params["random_state"])
+
+    optimizer = BayesianOptimization(f=None, pbounds=pbounds, random_state=opt_params["random_state"], allow_duplicate_points=True)
+    kappas = np.geomspace(0.1, 10, opt_params["batch_size"]) # spread batch from exploiting to exploring
+
+    mod_data = model.get_model().data
+    shm = share_features(mod_data)
+    shape = (mod_data.features_df.shape[0], len(SHARED_COLUMNS))
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(n_jobs, initializer=attach_features, initargs=(shm.name, shape)) as pool:
+            # explore randomly, then evaluate batches of suggestions concurrently
+            param_mat = rng.uniform(bounds[:, 0], bounds[:, 1], size=(opt_params["init_points"], bounds.shape[0]))
+            register(optimizer, param_mat, evaluate(pool, param_mat, n_jobs))
+
+            for _ in range(opt_params["n_iter"]):
+                suggestions = [optimizer.suggest(UtilityFunction(kind="ucb", kappa=kappa)) for kappa in kappas]
+                param_mat = np.unique([[suggestion[name] for name in param_names] for suggestion in suggestions], axis=0)
+                param_mat = drop_registered(optimizer, param_mat, param_names)
+
+                # replace duplicate and already evaluated suggestions with random candidates
+                n_random = kappas.shape[0] - param_mat.shape[0]
+                param_mat = np.vstack([param_mat, rng.uniform(bounds[:, 0], bounds[:, 1], size=(n_random, bounds.shape[0]))])
+                register(optimizer, param_mat, evaluate(pool, param_mat, n_jobs))
+
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # refine best candidate locally with gradients
+    best_params = [optimizer.max["params"][name] for name in param_names]
+    result = optimize.minimize(model.model_data, best_params, args=(False, True), method="L-BFGS-B", jac=True, bounds=bounds, options={"disp": True})
+    model.get_model().fit_stats = {
+        "method": "Bayesian search, L-BFGS-B", "search_evaluations": len(optimizer.space),
+        "iterations": result.nit, "evaluations": result.nfev
+    }
+    return result.x
+
+
+if __name__=="__main__":
+    params = search_params()
+    print(params)
+
+    # log metrics and params and export results
+    model.get_model().log_results(params)
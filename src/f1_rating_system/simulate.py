@@ -0,0 +1,143 @@
+import collections
+import concurrent.futures
+import os
+
+import numpy as np
+import pandas as pd
+
+from f1_rating_system import model, storage
+from f1_rating_system.config import get_config
+from f1_rating_system.features import POINTS_MAP
+
+
+CONFIG = get_config()
+
+# current season standings and the grid racing its remaining rounds, with
+# grid entries indexing drivers and constructors and rated by combined
+# rating over the c-factor
+Season = collections.namedtuple("Season", [
+    "year", "dri_df", "con_df", "grid_dri", "grid_con", "grid_strength", "n_rounds"
+])
+
+
+def get_season(hist_df: pd.DataFrame, races_df: pd.DataFrame, params: np.ndarray, col_df: pd.DataFrame, backend: type) -> Season:
+    '''Returns the points so far of the current season's drivers and
+    constructors, the combined ratings of the grid of its last round and
+    the number of its rounds still to race'''
+
+    year = hist_df["year"].max()
+    season_df = hist_df[hist_df["year"] == year]
+    last_round = season_df["round"].max()
+    n_rounds = int(((races_df["year"] == year) & (races_df["round"] > last_round)).sum())
+
+    dri_df = season_df.groupby(["driverId", "driverName"])["mapPoints"].sum().reset_index()
+    con_df = season_df.groupby(["constructorId", "constructorName"])["mapPoints"].sum().reset_index()
+    con_df = con_df.merge(col_df[["constructorId", "hex_code"]], on="constructorId", how="left")
+
+    # grid of the last round, rated as it left that round
+    grid_df = season_df[season_df["round"] == last_round].drop_duplicates("driverId")
+    grid_dri = pd.Index(dri_df["driverId"]).get_indexer(grid_df["driverId"])
+    grid_con = pd.Index(con_df["constructorId"]).get_indexer(grid_df["constructorId"])
+    rating_system = backend(*params)
+    grid_rtg = rating_system.get_combo_rating(grid_df["driverScore"].to_numpy(), grid_df["constructorScore"].to_numpy())
+
+    # drivers take the colour of their last constructor
+    dri_hex = pd.Series(con_df["hex_code"].to_numpy()[grid_con], index=grid_df["driverId"].to_numpy())
+    dri_df["hex_code"] = dri_df["driverId"].map(dri_hex)
+
+    return Season(year, dri_df, con_df, grid_dri, grid_con, grid_rtg / params[0], n_rounds)
+
+
+def get_position_counts(totals: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    '''Returns how often each entity (rows) finished each championship
+    position (columns) given their points totals per season, breaking ties
+    at random'''
+
+    n_entities = totals.shape[1]
+    order = np.lexsort((rng.random(totals.shape), -totals), axis=-1)
+    cells = order * n_entities + np.arange(n_entities)
+    return np.bincount(cells.ravel(), minlength=n_entities ** 2).reshape(n_entities, n_entities)
+
+
+def simulate_batch(season: Season, n_seasons: int, seed: np.random.SeedSequence) -> tuple:
+    '''Returns championship position counts and summed final points of
+    drivers and constructors over n_seasons simulated rest-of-seasons.
+    Finishing orders are Plackett-Luce draws from the grid's ratings, whose
+    pairwise win probabilities match the model's, with ratings held at
+    their current values and every car finishing.'''
+
+    rng = np.random.default_rng(seed)
+    n_grid = season.grid_strength.shape[0]
+    points = np.array([POINTS_MAP.get(position, 0) for position in range(1, n_grid + 1)], dtype=float)
+
+    # sort ratings perturbed by gumbel noise for each season and round
+    noise = rng.gumbel(size=(n_seasons, season.n_rounds, n_grid))
+    order = np.argsort(-(season.grid_strength + noise), axis=2)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_grid), axis=2)
+    grid_points = points[positions].sum(axis=1)
+
+    dri_totals = np.tile(season.dri_df["mapPoints"].to_numpy(dtype=float), (n_seasons, 1))
+    dri_totals[:, season.grid_dri] += grid_points
+    con_group = (season.grid_con[:, None] == np.arange(season.con_df.shape[0])[None, :]).astype(float)
+    con_totals = season.con_df["mapPoints"].to_numpy(dtype=float) + grid_points @ con_group
+
+    return (
+        get_position_counts(dri_totals, rng), dri_totals.sum(axis=0),
+        get_position_counts(con_totals, rng), con_totals.sum(axis=0)
+    )
+
+
+def get_odds(entity_df: pd.DataFrame, name_col: str, kind: str, counts: np.ndarray, points_sums: np.ndarray, n_seasons: int) -> pd.DataFrame:
+    '''Returns the probability of each championship position per entity,
+    with its points so far and expected final points'''
+
+    n_entities = entity_df.shape[0]
+    return pd.DataFrame({
+        "kind": kind,
+        "name": np.repeat(entity_df[name_col].to_numpy(), n_entities),
+        "hex_code": np.repeat(entity_df["hex_code"].to_numpy(), n_entities),
+        "points": np.repeat(entity_df["mapPoints"].to_numpy(), n_entities),
+        "expectedPoints": np.repeat(points_sums / n_seasons, n_entities),
+        "position": np.tile(np.arange(1, n_entities + 1), n_entities),
+        "probability": counts.ravel() / n_seasons
+    })
+
+
+def simulate_season(config: dict = None) -> None:
+    '''Simulates the rest of the current season from the current ratings and
+    saves championship position probabilities of drivers and constructors.
+    Seasons are simulated in batches, seeded from the configured seed so
+    results do not depend on the number of worker processes.'''
+
+    config = config or CONFIG
+    sim_config = config["simulate"]
+    hist_df = storage.read_dataset("hist_path", config=config)
+    races_df = pd.read_csv(config["data"]["races_csv"])
+    col_df = pd.read_csv(config["data"]["colour_csv"])
+    params = model.RatingModel(config).load_params()
+    season = get_season(hist_df, races_df, params, col_df, model.get_backend(config))
+
+    n_seasons, batch_seasons = sim_config["n_seasons"], sim_config["batch_seasons"]
+    batch_sizes = [min(batch_seasons, n_seasons - start) for start in range(0, n_seasons, batch_seasons)]
+    seeds = np.random.SeedSequence(sim_config["seed"]).spawn(len(batch_sizes))
+    n_jobs = sim_config["n_jobs"] or os.cpu_count()
+
+    if n_jobs == 1:
+        results = list(map(simulate_batch, [season] * len(batch_sizes), batch_sizes, seeds))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(n_jobs) as pool:
+            results = list(pool.map(simulate_batch, [season] * len(batch_sizes), batch_sizes, seeds))
+
+    dri_counts, dri_points, con_counts, con_points = (sum(batch_results) for batch_results in zip(*results))
+    odds_df = pd.concat([
+        get_odds(season.dri_df, "driverName", "driver", dri_counts, dri_points, n_seasons),
+        get_odds(season.con_df, "constructorName", "constructor", con_counts, con_points, n_seasons)
+    ], ignore_index=True)
+    odds_df["year"] = season.year
+    odds_df["remainingRounds"] = season.n_rounds
+    odds_df.to_csv(config["data"]["season_sim_path"], index=False)
+
+
+if __name__=="__main__":
+    simulate_season()
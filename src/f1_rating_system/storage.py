@@ -0,0 +1,200 @@
+import os
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from f1_rating_system.config import get_config
+
+
+CONFIG = get_config()
+
+# column dtypes of datasets passed between pipeline stages
+PREPROCESSED_SCHEMA = {
+    "year": "int16",
+    "round": "int8",
+    "date": "string",
+    "constructorId": "int32",
+    "constructorYearId": "Int32", # missing for constructors without a constructor-year
+    "driverId": "int32",
+    "grid": "int16",
+    "position": "Int16", # missing for non-finishers
+    "statusId": "int16"
+}
+
+FEATURES_SCHEMA = {
+    "year": "int16",
+    "round": "int8",
+    "date": "string",
+    "constructorId": "int32",
+    "constructorYearId": "int32",
+    "driverId": "int32",
+    "mapPosition": "int16",
+    "mapPoints": "float64",
+    "status": "category"
+}
+
+MODELLED_SCHEMA = FEATURES_SCHEMA | {
+    "constructorScore": "float64",
+    "driverScore": "float64",
+    "expected": "float64",
+    "actual": "int32"
+}
+
+# bootstrap interval bounds of the modelled ratings, missing if not bootstrapped
+BOUNDS_SCHEMA = {
+    "driverScoreLower": "float64",
+    "driverScoreUpper": "float64",
+    "constructorScoreLower": "float64",
+    "constructorScoreUpper": "float64"
+}
+
+HIST_SCHEMA = MODELLED_SCHEMA | {
+    "driverName": "string",
+    "constructorName": "string",
+    "startDriScore": "float64",
+    "driScoreChange": "float64",
+    "startConScore": "float64",
+    "conScoreChange": "float64"
+} | BOUNDS_SCHEMA
+
+BOOTSTRAP_SCHEMA = {
+    "year": "int16",
+    "round": "int8",
+    "driverId": "int32",
+    "constructorYearId": "int32",
+    "driverScore": "float64"
+} | BOUNDS_SCHEMA
+
+CAREER_BOUNDS_SCHEMA = {
+    "driverId": "int32",
+    "meanScoreLower": "float64",
+    "meanScoreUpper": "float64"
+}
+
+# head-to-head records of teammates per constructor-year, from driver A's side
+TEAMMATES_SCHEMA = {
+    "driverIdA": "int32",
+    "driverIdB": "int32",
+    "year": "int16",
+    "constructorYearId": "int32",
+    "driverNameA": "string",
+    "driverNameB": "string",
+    "constructorName": "string",
+    "races": "int16",
+    "wins": "int16",
+    "losses": "int16",
+    "meanGap": "float64",
+    "finalGap": "float64"
+}
+
+SCHEMAS = {
+    "preprocessed_path": PREPROCESSED_SCHEMA,
+    "features_path": FEATURES_SCHEMA,
+    "modelled_path": MODELLED_SCHEMA,
+    "hist_path": HIST_SCHEMA,
+    "bootstrap_path": BOOTSTRAP_SCHEMA,
+    "career_bounds_path": CAREER_BOUNDS_SCHEMA,
+    "teammates_path": TEAMMATES_SCHEMA
+}
+
+
+def write_dataset(df: pd.DataFrame, path_key: str, append: bool = False, config: dict = None) -> None:
+    '''Writes a dataset in its schema to the Parquet file at config["data"][path_key],
+    also exporting a CSV copy if config["data"]["export_csv"]. If append = True,
+    adds rows to the existing dataset. Uses the project config unless config
+    is given.'''
+
+    config = config or CONFIG
+    schema = SCHEMAS[path_key]
+    path = config["data"][path_key]
+    if append:
+        df = pd.concat([read_dataset(path_key, config=config), df], ignore_index=True)
+
+    df = df[list(schema)].astype(schema)
+
+    df.to_parquet(path, index=False)
+
+    if config["data"]["export_csv"]:
+        df.to_csv(os.path.splitext(path)[0] + ".csv", index=False)
+
+
+def read_dataset(path_key: str, columns: list = None, config: dict = None) -> pd.DataFrame:
+    '''Returns the dataset at config["data"][path_key], optionally only the
+    given columns. Uses the project config unless config is given.'''
+    return pd.read_parquet((config or CONFIG)["data"][path_key], columns=columns, memory_map=True)
+
+
+def iter_rounds(path_key: str, columns: list = None, batch_rows: int = 65536, config: dict = None) -> Iterator[pd.DataFrame]:
+    '''Yields the rows of a dataset sorted by year and round in batches of
+    whole rounds, reading about batch_rows rows at a time so memory is bounded
+    by the batch size rather than the dataset size. Uses the project config
+    unless config is given.'''
+
+    parquet_file = pq.ParquetFile((config or CONFIG)["data"][path_key])
+    carry_df = None
+    last_key = -1
+    for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+        batch_df = batch.to_pandas()
+        if carry_df is not None:
+            batch_df = pd.concat([carry_df, batch_df], ignore_index=True)
+
+        round_keys = batch_df["year"].to_numpy(dtype=np.int64) * 1000 + batch_df["round"].to_numpy(dtype=np.int64)
+        if round_keys[0] < last_key or (np.diff(round_keys) < 0).any():
+            raise ValueError(f"{path_key} is not sorted by year and round")
+
+        # carry the last round over, as it may continue in the next batch
+        last_start = np.searchsorted(round_keys, round_keys[-1])
+        if last_start > 0:
+            yield batch_df.iloc[:last_start].reset_index(drop=True)
+
+        carry_df = batch_df.iloc[last_start:].reset_index(drop=True)
+        last_key = round_keys[-1]
+
+    if carry_df is not None:
+        yield carry_df
+
+
+def write_stream(frames: Iterable[pd.DataFrame], path_key: str, batch_rows: int = 65536, config: dict = None) -> int:
+    '''Writes frames of a dataset in its schema as they are produced,
+    buffering at most batch_rows rows before writing them as a row group, also
+    exporting a CSV copy if config["data"]["export_csv"]. Returns the number
+    of rows written. Uses the project config unless config is given.'''
+
+    config = config or CONFIG
+    schema = SCHEMAS[path_key]
+    path = config["data"][path_key]
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    writer = None
+    buffer = []
+    n_buffered = n_rows = 0
+
+    def flush() -> None:
+        nonlocal writer, buffer, n_buffered, n_rows
+        df = pd.concat(buffer, ignore_index=True)[list(schema)].astype(schema)
+        table = pa.Table.from_pandas(df, preserve_index=False, schema=writer.schema if writer else None)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+
+        if config["data"]["export_csv"]:
+            df.to_csv(csv_path, mode="a" if n_rows else "w", header=not n_rows, index=False)
+
+        n_rows += df.shape[0]
+        buffer, n_buffered = [], 0
+
+    try:
+        for df in frames:
+            buffer.append(df)
+            n_buffered += df.shape[0]
+            if n_buffered >= batch_rows:
+                flush()
+
+        if buffer:
+            flush()
+    finally:
+        if writer:
+            writer.close()
+
+    return n_rows
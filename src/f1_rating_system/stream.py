@@ -0,0 +1,13 @@
+from f1_rating_system import model
+
+
+def stream_ratings() -> None:
+    '''Rates all rounds with the fitted params one round at a time, for
+    histories too large to model in memory'''
+
+    log_likelihood = model.get_model().stream_data()
+    print(f"log likelihood: {log_likelihood}")
+
+
+if __name__=="__main__":
+    stream_ratings()
@@ -0,0 +1,17 @@
+from f1_rating_system import data, features, model, report, simulate
+
+
+def update_ratings() -> None:
+    '''Refreshes ratings after new races, modelling only rounds added since
+    the last model checkpoint, and resimulates the rest of the season from
+    the updated ratings'''
+
+    data.preprocess_data()
+    features.create_features()
+    model.get_model().update_data()
+    report.make_report_data()
+    simulate.simulate_season()
+
+
+if __name__=="__main__":
+    update_ratings()